@@ -2,84 +2,128 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_ckeditor import CKEditor
-from flask_bcrypt import Bcrypt
 from flask_migrate import Migrate
 from flask_mail import Mail
 from datetime import datetime
-import os
 import re
 from flask_wtf.csrf import CSRFProtect
+from app.db_routing import RoutingSession
 
 # Initialize extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 ckeditor = CKEditor()
-bcrypt = Bcrypt()
 csrf = CSRFProtect()
 mail = Mail()
 
 # Initialize migrate after db is created in create_app
 
-def create_app():
-    app = Flask(__name__)
-    
-    # Load environment variables from .env file if it exists
-    from dotenv import load_dotenv
-    load_dotenv()
-    
-    # Configuration
-    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-key-123')
-    
-    # Database configuration
-    if os.environ.get('DATABASE_URL'):
-        # Handle Heroku's postgres URL format
-        uri = os.environ.get('DATABASE_URL')
-        if uri.startswith('postgres://'):
-            uri = uri.replace('postgres://', 'postgresql://', 1)
-        app.config['SQLALCHEMY_DATABASE_URI'] = uri
-    else:
-        # Use SQLite for development
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///blog.db'
-    
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    
-    # Email configuration
-    app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', 'smtp.googlemail.com')
-    app.config['MAIL_PORT'] = int(os.environ.get('MAIL_PORT', '587'))
-    app.config['MAIL_USE_TLS'] = os.environ.get('MAIL_USE_TLS', 'true').lower() in ['true', 'on', '1']
-    app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME')
-    app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD')
-    
-    # Initialize extensions with app
-    with app.app_context():
-        db.init_app(app)
-        login_manager.init_app(app)
-        ckeditor.init_app(app)
-        
-        # Import models here to avoid circular imports
-        from .models import User, Post, Comment, Like, Notification
-        
-        # Create tables if they don't exist
-        if os.environ.get('FLASK_ENV') != 'production' or os.environ.get('DATABASE_URL'):
+def create_app(config_class=None):
+    """
+    Build the app from ``config_class`` (``config.Config`` by default, which
+    reads the environment and ``.env``).
+    """
+    from app.startup import BootTimer
+    boot = BootTimer()
+    
+    with boot.phase('config'):
+        app = _configure(Flask(__name__), config_class)
+    
+    with boot.phase('extensions'):
+        _init_extensions(app)
+    
+    # Production relies on `flask db upgrade`; creating tables from the
+    # models there would only reflect the schema on every worker boot
+    if app.config['AUTO_CREATE_SCHEMA']:
+        with boot.phase('schema'), app.app_context():
+            from app.search import search_index
             try:
                 db.create_all()
+                search_index.create_schema()
             except Exception as e:
                 print(f"Error creating database tables: {e}")
+    
+    with boot.phase('blueprints'):
+        _register_blueprints(app)
+    
+    boot.report(app)
+    return app
+
+
+def _configure(app, config_class=None):
+    if config_class is None:
+        from config import Config as config_class
+    app.config.from_object(config_class)
+    
+    # Settings derived from others
+    from app.database import engine_options
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    replica_uri = app.config.get('REPLICA_DATABASE_URL')
+    if replica_uri:
+        replica_options = engine_options(dict(app.config, SQLALCHEMY_DATABASE_URI=replica_uri))
+        app.config['SQLALCHEMY_BINDS'] = {'replica': dict(replica_options, url=replica_uri)}
+    
+    config_class.init_app(app)
+    return app
+
+
+def _init_extensions(app):
+    db.init_app(app)
+    from app.database import configure_engines
+    configure_engines(app)
+    
+    from app.db_routing import replica_router
+    replica_router.init_app(app)
+    
+    # First in, so its before/after hooks wrap everything registered later
+    from app.instrumentation import request_profiler
+    request_profiler.init_app(app)
+    login_manager.init_app(app)
+    ckeditor.init_app(app)
+    
+    # Import models here to avoid circular imports
+    from . import models
+    
+    from app.search import search_index
+    search_index.init_app(app)
+    
     migrate = Migrate(app, db)  # Initialize migrate with app and db
     mail.init_app(app)
     csrf.init_app(app)
     
-    # Configure login manager
-    login_manager.login_view = 'auth.login'
-    login_manager.login_message_category = 'info'
+    from app.fragments import fragment_cache
+    fragment_cache.init_app(app)
+    
+    from app.assets import assets
+    assets.init_app(app)
+    
+    from app.view_counter import view_counter
+    view_counter.init_app(app)
+    
+    from app.presence import last_seen
+    last_seen.init_app(app)
+    
+    from app.user_cache import user_cache
+    user_cache.init_app(app)
+    
+    from app.liked_cache import liked_cache
+    liked_cache.init_app(app)
+    
+    from app.categories import category_index
+    category_index.init_app(app)
     
-    # Configure file uploads
-    app.config['UPLOAD_FOLDER'] = os.path.join('app', 'static', 'profile_pics')
+    from app.outbox import mail_outbox
+    mail_outbox.init_app(app)
     
-    # Create upload folder if it doesn't exist
-    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-    app.config['MAX_CONTENT_LENGTH'] = 5 * 1024 * 1024  # 5MB max file size
+    from app.passwords import passwords
+    passwords.init_app(app)
     
+    # Configure login manager
+    login_manager.login_view = 'auth.login'
+    login_manager.login_message_category = 'info'
+
+
+def _register_blueprints(app):
     # Register blueprints
     from app.main.routes import main
     from app.auth.routes import auth
@@ -91,13 +135,11 @@ def create_app():
     app.register_blueprint(user_blueprint, url_prefix='/user')
     app.register_blueprint(posts, url_prefix='/')
     
+    # Register CLI commands
+    from app.commands import register_commands
+    register_commands(app)
+    
     # Add context processor to make current_year available in all templates
     @app.context_processor
     def inject_current_year():
         return {'current_year': datetime.now().year}
-    
-    # Create database tables if they don't exist
-    with app.app_context():
-        db.create_all()
-    
-    return app
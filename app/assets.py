@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import shutil
+from io import BytesIO
+
+from flask import request, url_for
+
+# Sources fingerprinted by ``flask build-assets``, relative to the static folder
+ASSET_FILES = ('css/style.css', 'css/portfolio.css', 'js/main.js')
+IMAGE_DIR = 'images'
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+IMAGE_WIDTHS = (480, 960, 1600)
+
+BUILD_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+
+
+def _fingerprint(data):
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def _write_hashed(static_folder, logical, data, ext=None):
+    """Write ``data`` under dist/ with its content hash in the name."""
+    stem, orig_ext = os.path.splitext(logical)
+    hashed = f'{BUILD_DIR}/{stem}.{_fingerprint(data)}{ext or orig_ext}'
+    path = os.path.join(static_folder, hashed)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return hashed
+
+
+def _encode(image, fmt):
+    buffer = BytesIO()
+    image.save(buffer, fmt, quality=80, optimize=fmt == 'JPEG')
+    return buffer.getvalue()
+
+
+def _image_formats():
+    from PIL import Image
+
+    Image.init()
+    formats = [('JPEG', '.jpg'), ('WEBP', '.webp')]
+    # AVIF needs a Pillow build (or plugin) with libavif
+    if 'AVIF' in Image.SAVE:
+        formats.append(('AVIF', '.avif'))
+    return formats
+
+
+def build_assets(static_folder, widths=IMAGE_WIDTHS):
+    """
+    Fingerprint CSS/JS and emit resized, re-encoded image variants.
+
+    Everything lands in ``static/dist`` alongside a manifest mapping each
+    logical path to its hashed file (and, for images, to its variants).
+    Returns the manifest.
+    """
+    from PIL import Image
+
+    shutil.rmtree(os.path.join(static_folder, BUILD_DIR), ignore_errors=True)
+    manifest = {'files': {}, 'variants': {}}
+
+    for logical in ASSET_FILES:
+        with open(os.path.join(static_folder, logical), 'rb') as f:
+            manifest['files'][logical] = _write_hashed(static_folder, logical, f.read())
+
+    formats = _image_formats()
+    image_root = os.path.join(static_folder, IMAGE_DIR)
+    for dirpath, _, filenames in os.walk(image_root):
+        for filename in sorted(filenames):
+            if not filename.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            source = os.path.join(dirpath, filename)
+            logical = os.path.relpath(source, static_folder).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                data = f.read()
+            if not data:
+                continue
+            manifest['files'][logical] = _write_hashed(static_folder, logical, data)
+
+            variants = []
+            with Image.open(source) as original:
+                image = original.convert('RGB')
+            for width in widths:
+                if width >= image.width:
+                    continue
+                height = round(image.height * width / image.width)
+                resized = image.resize((width, height), Image.LANCZOS)
+                for fmt, ext in formats:
+                    stem, _ = os.path.splitext(logical)
+                    hashed = _write_hashed(static_folder, f'{stem}-{width}w', _encode(resized, fmt), ext)
+                    variants.append({'width': width, 'format': ext[1:], 'path': hashed})
+            manifest['variants'][logical] = variants
+
+    with open(os.path.join(static_folder, BUILD_DIR, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+class StaticAssets:
+    """Resolves logical static paths through the build manifest, if there is one."""
+
+    def __init__(self):
+        self.manifest = {'files': {}, 'variants': {}}
+
+    def init_app(self, app):
+        self.load(os.path.join(app.static_folder, BUILD_DIR, MANIFEST_NAME))
+        app.add_template_global(self.static_url, 'static_url')
+        app.add_template_global(self.static_srcset, 'static_srcset')
+        app.after_request(self._cache_headers)
+
+    def load(self, manifest_path):
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self.manifest = json.load(f)
+
+    def static_url(self, filename):
+        """URL of the fingerprinted build of ``filename``, or the source file."""
+        return url_for('static', filename=self.manifest['files'].get(filename, filename))
+
+    def static_srcset(self, filename, fmt='webp'):
+        """``srcset`` value listing the ``fmt`` variants built for an image."""
+        return ', '.join(
+            f"{url_for('static', filename=v['path'])} {v['width']}w"
+            for v in self.manifest['variants'].get(filename, ())
+            if v['format'] == fmt
+        )
+
+    def _cache_headers(self, response):
+        # Hashed names change with their content, so they never need revalidating
+        if request.endpoint == 'static' and \
+                (request.view_args or {}).get('filename', '').startswith(BUILD_DIR + '/'):
+            response.cache_control.public = True
+            response.cache_control.max_age = 31536000
+            response.cache_control.immutable = True
+        return response
+
+
+assets = StaticAssets()
@@ -1,9 +1,11 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
 from flask_login import login_user, current_user, logout_user, login_required
-from app import db, bcrypt, mail
+from app import db
 from app.models import User
+from app.user_cache import user_cache
+from app.outbox import mail_outbox
+from app.passwords import passwords
 from app.auth.forms import RegistrationForm, LoginForm, RequestResetForm, ResetPasswordForm
-from flask_mail import Message
 import secrets
 import os
 from datetime import datetime, timedelta
@@ -16,8 +18,8 @@ def register():
         return redirect(url_for('main.home'))
     form = RegistrationForm()
     if form.validate_on_submit():
-        hashed_password = bcrypt.generate_password_hash(form.password.data).decode('utf-8')
-        user = User(username=form.username.data, email=form.email.data, password=hashed_password)
+        user = User(username=form.username.data, email=form.email.data)
+        user.set_password(form.password.data)
         db.session.add(user)
         db.session.commit()
         flash('Your account has been created! You are now able to log in', 'success')
@@ -31,12 +33,18 @@ def login():
     form = LoginForm()
     if form.validate_on_submit():
         user = User.query.filter_by(email=form.email.data).first()
-        if user and bcrypt.check_password_hash(user.password, form.password.data):
+        if user is None:
+            # Spend as long on an unknown email as on a wrong password
+            passwords.verify(None, form.password.data)
+        elif user.check_password(form.password.data):
+            if db.session.is_modified(user):
+                # The stored hash was upgraded to the current policy
+                db.session.commit()
+                user_cache.invalidate(user.id)
             login_user(user, remember=form.remember.data)
             next_page = request.args.get('next')
             return redirect(next_page) if next_page else redirect(url_for('main.home'))
-        else:
-            flash('Login Unsuccessful. Please check email and password', 'danger')
+        flash('Login Unsuccessful. Please check email and password', 'danger')
     return render_template('login.html', title='Login', form=form)
 
 @auth.route("/logout")
@@ -49,17 +57,18 @@ def logout():
 def account():
     return render_template('account.html', title='Account')
 
-def send_reset_email(user):
-    token = user.get_reset_token()
-    msg = Message('Password Reset Request',
-                  sender=os.environ.get('EMAIL_USER'),
-                  recipients=[user.email])
-    msg.body = f'''To reset your password, visit the following link:
+def send_reset_email(user, token):
+    # Queued rather than sent so the request never waits on SMTP
+    mail_outbox.enqueue('Password Reset Request',
+                        sender=os.environ.get('EMAIL_USER'),
+                        recipients=[user.email],
+                        body=f'''To reset your password, visit the following link:
 {url_for('auth.reset_token', token=token, _external=True)}
 
 If you did not make this request then simply ignore this email and no changes will be made.
-'''
-    mail.send(msg)
+''')
+    db.session.commit()
+    mail_outbox.wake()
 
 def get_reset_token(user, expires_sec=1800):
     token = secrets.token_urlsafe(32)
@@ -83,7 +92,7 @@ def reset_request():
         user = User.query.filter_by(email=form.email.data).first()
         if user:
             token = get_reset_token(user)
-            send_reset_email(user)
+            send_reset_email(user, token)
         flash('An email has been sent with instructions to reset your password.', 'info')
         return redirect(url_for('auth.login'))
     return render_template('reset_request.html', title='Reset Password', form=form)
@@ -98,11 +107,11 @@ def reset_token(token):
         return redirect(url_for('auth.reset_request'))
     form = ResetPasswordForm()
     if form.validate_on_submit():
-        hashed_password = bcrypt.generate_password_hash(form.password.data).decode('utf-8')
-        user.password_hash = hashed_password
+        user.set_password(form.password.data)
         user.reset_token = None
         user.reset_token_expiry = None
         db.session.commit()
+        user_cache.invalidate(user.id)
         flash('Your password has been updated! You are now able to log in', 'success')
         return redirect(url_for('auth.login'))
     return render_template('reset_token.html', title='Reset Password', form=form)
@@ -0,0 +1,58 @@
+import os
+import threading
+
+
+class BackgroundWorker:
+    """
+    Base for a per-process daemon thread that calls :meth:`_work` every
+    ``interval`` seconds, or straight away after :meth:`wake`.
+
+    The thread is started lazily and remembers the pid it belongs to, so
+    every forked gunicorn worker starts its own instead of counting on one
+    the master started before forking. :meth:`_forked` lets subclasses drop
+    state inherited from the parent at that point.
+    """
+
+    worker_name = None
+    interval = 30
+
+    def __init__(self):
+        self.app = None
+        self._lock = threading.Lock()
+        self._pid = None
+        self._wakeup = None
+
+    def _ensure_worker(self):
+        # Called with the lock held
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._forked()
+        self._wakeup = threading.Event()
+        thread = threading.Thread(target=self._run, name=self.worker_name, daemon=True)
+        thread.start()
+
+    def start(self):
+        """Start this process's thread unless it is already running."""
+        if self._pid != os.getpid():
+            with self._lock:
+                self._ensure_worker()
+
+    def _forked(self):
+        """Hook run with the lock held when a process starts its thread."""
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self._work()
+            except Exception:
+                self.app.logger.exception('%s worker failed', type(self).__name__)
+
+    def _work(self):
+        raise NotImplementedError
+
+    def wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
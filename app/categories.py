@@ -0,0 +1,207 @@
+import time
+
+from sqlalchemy import case, delete, event, func, inspect, or_, select, update
+
+# Tile images for the categories the site launched with; anything newer
+# falls back to the generic background
+CATEGORY_IMAGES = {
+    'fashion': 'images/fashion-category.jpg',
+    'beauty': 'images/categories/beauty-category.jpg',
+    'lifestyle': 'images/categories/lifestyle-category.jpg',
+}
+DEFAULT_CATEGORY_IMAGE = 'images/default-bg.jpg'
+
+
+def category_image(category):
+    return CATEGORY_IMAGES.get(category, DEFAULT_CATEGORY_IMAGE)
+
+
+class CategoryIndex:
+    """
+    Keeps ``category_stats`` (post count and newest post per category) in
+    step with ``post``.
+
+    Every insert, delete, or change of category or date on a post applies
+    a one-row delta in the same flush, so the home tiles and navigation
+    read a handful of rows instead of grouping the whole post table. Only
+    removing a category's newest post needs a lookup, which is one seek on
+    ix_post_category_date_posted. Core bulk writes (the seeder) bypass the
+    events; ``flask rebuild-category-stats`` recomputes the table.
+
+    The rows are cached per process for ``CATEGORY_STATS_TTL`` seconds and
+    dropped whenever this process changes them; other workers may see them
+    that stale, which is fine for the navigation. Anything that has to
+    agree with the posts it lists (pagination totals, validators) passes
+    ``fresh=True``.
+    """
+
+    def __init__(self, ttl=30):
+        self.ttl = ttl
+        self._cached = None
+        self._expires = 0
+        self._listening = False
+        self.adjustments = 0
+        self.rescans = 0
+        self.loads = 0
+
+    def init_app(self, app):
+        from app.models import Post
+
+        self.ttl = app.config.setdefault('CATEGORY_STATS_TTL', self.ttl)
+        if not self._listening:
+            event.listen(Post, 'after_insert', self._after_insert)
+            event.listen(Post, 'after_update', self._after_update)
+            event.listen(Post, 'after_delete', self._after_delete)
+            self._listening = True
+        app.add_template_global(self.all, 'category_stats')
+        app.add_template_global(category_image, 'category_image')
+
+        from app.metrics import register_collector
+        register_collector('categories', self.stats)
+
+    def all(self, fresh=False):
+        """Every non-empty category, most posts first."""
+        cached = self._cached
+        if not fresh and cached is not None and self._expires > time.monotonic():
+            return cached
+        from app import db
+        from app.models import CategoryStats
+
+        cached = db.session.execute(
+            select(CategoryStats.category, CategoryStats.post_count,
+                   CategoryStats.latest_post_id, CategoryStats.latest_date)
+            .order_by(CategoryStats.post_count.desc(), CategoryStats.category)
+        ).all()
+        self.loads += 1
+        self._cached, self._expires = cached, time.monotonic() + self.ttl
+        return cached
+
+    def get(self, category, fresh=False):
+        """The stats row for ``category``, or None if it has no posts."""
+        if not fresh:
+            return next((row for row in self.all() if row.category == category), None)
+        from app import db
+        from app.models import CategoryStats
+
+        return db.session.execute(
+            select(CategoryStats.category, CategoryStats.post_count,
+                   CategoryStats.latest_post_id, CategoryStats.latest_date)
+            .where(CategoryStats.category == category)
+        ).first()
+
+    def invalidate(self):
+        self._cached = None
+
+    # Mapper events; ``connection`` is the one the flush is running on
+
+    def _after_insert(self, mapper, connection, post):
+        self._add(connection, post.category, post.id, post.date_posted)
+
+    def _after_update(self, mapper, connection, post):
+        state = inspect(post)
+        category = state.attrs.category.history
+        date_posted = state.attrs.date_posted.history
+        if not category.has_changes() and not date_posted.has_changes():
+            return
+        # Post.category has active_history, so a changed category always
+        # carries its old value
+        old_category = category.deleted[0] if category.deleted else post.category
+        self._remove(connection, old_category, post.id)
+        self._add(connection, post.category, post.id, post.date_posted)
+
+    def _after_delete(self, mapper, connection, post):
+        self._remove(connection, post.category, post.id)
+
+    def _add(self, connection, category, post_id, date_posted):
+        from app.models import CategoryStats
+
+        if connection.dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stats = CategoryStats.__table__
+        statement = insert(stats).values(
+            category=category, post_count=1,
+            latest_post_id=post_id, latest_date=date_posted)
+        newer = or_(stats.c.latest_date.is_(None),
+                    statement.excluded.latest_date >= stats.c.latest_date)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=['category'],
+            set_={
+                'post_count': stats.c.post_count + 1,
+                'latest_post_id': case((newer, statement.excluded.latest_post_id),
+                                       else_=stats.c.latest_post_id),
+                'latest_date': case((newer, statement.excluded.latest_date),
+                                    else_=stats.c.latest_date),
+            },
+        ))
+        self.adjustments += 1
+        self.invalidate()
+
+    def _remove(self, connection, category, post_id):
+        from app.models import CategoryStats, Post
+
+        stats = CategoryStats.__table__
+        row = connection.execute(
+            update(stats)
+            .where(stats.c.category == category)
+            .values(post_count=stats.c.post_count - 1)
+            .returning(stats.c.post_count, stats.c.latest_post_id)
+        ).first()
+        self.adjustments += 1
+        self.invalidate()
+        if row is None:
+            return
+        if row.post_count <= 0:
+            connection.execute(delete(stats).where(stats.c.category == category))
+        elif row.latest_post_id == post_id:
+            # The post has already left the category, so the index's first
+            # entry is the new newest
+            posts = Post.__table__
+            latest = connection.execute(
+                select(posts.c.id, posts.c.date_posted)
+                .where(posts.c.category == category)
+                .order_by(posts.c.date_posted.desc(), posts.c.id.desc())
+                .limit(1)
+            ).first()
+            connection.execute(
+                update(stats)
+                .where(stats.c.category == category)
+                .values(latest_post_id=latest.id if latest else None,
+                        latest_date=latest.date_posted if latest else None)
+            )
+            self.rescans += 1
+
+    def rebuild(self, connection):
+        """Recompute every row from ``post``; returns the number of categories."""
+        from app.models import CategoryStats, Post
+
+        stats = CategoryStats.__table__
+        posts = Post.__table__
+        groups = connection.execute(
+            select(posts.c.category, func.count(), func.max(posts.c.date_posted))
+            .group_by(posts.c.category)
+        ).all()
+        rows = []
+        for category, post_count, latest_date in groups:
+            latest_post_id = connection.execute(
+                select(func.max(posts.c.id))
+                .where(posts.c.category == category, posts.c.date_posted == latest_date)
+            ).scalar()
+            rows.append({'category': category, 'post_count': post_count,
+                         'latest_post_id': latest_post_id, 'latest_date': latest_date})
+        connection.execute(delete(stats))
+        if rows:
+            connection.execute(stats.insert(), rows)
+        self.invalidate()
+        return len(rows)
+
+    def stats(self):
+        return {
+            'adjustments': self.adjustments,
+            'latest_rescans': self.rescans,
+            'loads': self.loads,
+        }
+
+
+category_index = CategoryIndex()
@@ -0,0 +1,278 @@
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import func, select, update
+
+from app import db
+from app.models import Post, Comment, Like, make_summary
+
+
+@click.command('reconcile-like-counts')
+@with_appcontext
+def reconcile_like_counts():
+    """Recompute drifted post.like_count values from the likes table."""
+    actual = (
+        select(func.count(Like.id))
+        .where(Like.post_id == Post.id)
+        .scalar_subquery()
+    )
+    result = db.session.execute(
+        update(Post)
+        .where(Post.like_count != actual)
+        .values(like_count=actual)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    click.echo(f'Reconciled like counts on {result.rowcount} post(s).')
+
+
+@click.command('backfill-summaries')
+@click.option('--batch-size', default=500, show_default=True)
+@click.option('--all', 'refresh_all', is_flag=True,
+              help='Recompute every summary, not just missing ones.')
+@with_appcontext
+def backfill_summaries(batch_size, refresh_all):
+    """Fill post.summary from post.content in id-ordered batches."""
+    last_id = 0
+    total = 0
+    while True:
+        query = db.session.query(Post.id, Post.content, Post.last_updated)\
+                          .filter(Post.id > last_id)
+        if not refresh_all:
+            query = query.filter(Post.summary.is_(None))
+        rows = query.order_by(Post.id).limit(batch_size).all()
+        if not rows:
+            break
+
+        # Pass last_updated through so the backfill does not look like an edit
+        db.session.execute(update(Post), [
+            {'id': row.id, 'summary': make_summary(row.content),
+             'last_updated': row.last_updated}
+            for row in rows
+        ])
+        db.session.commit()
+        last_id = rows[-1].id
+        total += len(rows)
+        click.echo(f'Backfilled {total} summaries (through post {last_id}).')
+
+    click.echo(f'Done: {total} post(s) updated.')
+
+
+@click.command('build-assets')
+@with_appcontext
+def build_assets_command():
+    """Write fingerprinted CSS/JS and responsive image variants to static/dist."""
+    from app.assets import build_assets
+
+    manifest = build_assets(current_app.static_folder)
+    variants = sum(len(v) for v in manifest['variants'].values())
+    click.echo(f"Built {len(manifest['files'])} file(s) and {variants} image variant(s).")
+
+
+@click.command('search-reindex')
+@click.option('--batch-size', default=500, show_default=True)
+@with_appcontext
+def search_reindex(batch_size):
+    """Rebuild the full-text post search index from scratch."""
+    from app.search import search_index
+
+    total = search_index.reindex(batch_size=batch_size)
+    click.echo(f'Indexed {total} post(s).')
+
+
+@click.command('send-outbox')
+@with_appcontext
+def send_outbox():
+    """Send every queued email that is due now."""
+    from app.outbox import mail_outbox
+
+    sent = mail_outbox.deliver()
+    stats = mail_outbox.stats()
+    click.echo(f"Sent {sent} message(s); {stats['retried']} rescheduled, "
+               f"{stats['failed']} given up on.")
+
+
+def _listing_queries():
+    """The item query behind each listing view, keyed by endpoint."""
+    from app.main.feed import feed_query
+
+    # Cursor-paginated listings order on (sort column, id)
+    profile_posts = Post.query.filter_by(user_id=1, is_published=True)\
+                              .order_by(Post.date_posted.desc(), Post.id.desc()).limit(10)
+    return {
+        'main.home': feed_query().limit(6),
+        'main.blog': feed_query().order_by(None)
+                                 .order_by(Post.date_posted.desc(), Post.id.desc()).limit(6),
+        'main.category': feed_query('fashion').order_by(None)
+                                              .order_by(Post.date_posted.desc(), Post.id.desc()).limit(6),
+        'user.profile': Post.query.filter_by(user_id=1, is_published=True)
+                                  .order_by(Post.date_posted.desc()).limit(10),
+        'user.user_posts': profile_posts,
+        'user.user_comments': Comment.query.filter_by(user_id=1, is_approved=True)
+                                           .order_by(Comment.date_posted.desc(), Comment.id.desc()).limit(10),
+        'posts.post_likes': Like.query.filter_by(post_id=1)
+                                      .order_by(Like.timestamp.desc(), Like.id.desc()).limit(10),
+    }
+
+
+def _plan_problems(plan):
+    """Return plan steps that read a whole table or sort in a temp b-tree."""
+    problems = []
+    for row in plan:
+        detail = row[-1]
+        if 'USE TEMP B-TREE' in detail:
+            problems.append(detail)
+        elif detail.startswith('SCAN') and 'INDEX' not in detail:
+            problems.append(detail)
+    return problems
+
+
+@click.command('check-query-plans')
+@with_appcontext
+def check_query_plans():
+    """Fail if a listing query falls back to a full scan plus sort on SQLite."""
+    if db.engine.dialect.name != 'sqlite':
+        raise click.ClickException('Query plan checks only run against SQLite.')
+
+    connection = db.session.connection()
+    failed = False
+    for endpoint, query in _listing_queries().items():
+        sql = query.statement.compile(
+            dialect=db.engine.dialect, compile_kwargs={'literal_binds': True})
+        plan = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}').all()
+        problems = _plan_problems(plan)
+        if problems:
+            failed = True
+            click.echo(f'FAIL {endpoint}: ' + '; '.join(problems))
+        else:
+            click.echo(f'ok   {endpoint}')
+
+    if failed:
+        raise click.ClickException('One or more listing queries are not index-backed.')
+
+
+@click.command('seed')
+@click.option('--users', default=10_000, show_default=True)
+@click.option('--posts', default=100_000, show_default=True)
+@click.option('--likes', default=1_000_000, show_default=True)
+@click.option('--comments', default=300_000, show_default=True)
+@click.option('--seed', 'rng_seed', default=42, show_default=True,
+              help='Random seed; the same seed on an empty database gives the same data.')
+@with_appcontext
+def seed(users, posts, likes, comments, rng_seed):
+    """Bulk-insert a synthetic dataset for load tests and benchmarks."""
+    from app.seed import seed_database
+    from app.search import search_index
+
+    seed_database(users=users, posts=posts, likes=likes, comments=comments,
+                  seed=rng_seed, echo=click.echo)
+    total = search_index.reindex()
+    click.echo(f'Indexed {total} post(s) for search.')
+    # The seeder's Core inserts bypass the per-post stats events
+    _rebuild_category_stats()
+
+
+def _rebuild_category_stats():
+    from app.categories import category_index
+
+    total = category_index.rebuild(db.session.connection())
+    db.session.commit()
+    click.echo(f'Rebuilt category stats for {total} category(ies).')
+
+
+@click.command('rebuild-category-stats')
+@with_appcontext
+def rebuild_category_stats():
+    """Recompute category_stats from the post table."""
+    _rebuild_category_stats()
+
+
+@click.command('sync-sqlite-replica')
+@with_appcontext
+def sync_sqlite_replica():
+    """Copy a SQLite primary onto the SQLite replica file (local testing)."""
+    import sqlite3
+    from app.db_routing import REPLICA_BIND
+
+    replica = db.engines.get(REPLICA_BIND)
+    if replica is None:
+        raise click.ClickException('No replica configured; set REPLICA_DATABASE_URL.')
+    if db.engine.dialect.name != 'sqlite' or replica.dialect.name != 'sqlite':
+        raise click.ClickException('Only SQLite primaries and replicas can be synced this way.')
+
+    # Release pooled connections to the replica before overwriting it
+    replica.dispose()
+    source = sqlite3.connect(db.engine.url.database)
+    target = sqlite3.connect(replica.url.database)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    click.echo(f'Copied {db.engine.url.database} to {replica.url.database}.')
+
+
+# The schema db.create_all() produced before migrations were introduced
+INITIAL_REVISION = '3f1a2c9d8e01'
+INITIAL_TABLES = {'user', 'post', 'comment', 'likes', 'message'}
+
+
+def _unrevisioned_schema(inspector, tables):
+    """
+    The revision an un-stamped database built by db.create_all() matches:
+    'head' if it has every table and column of the current models,
+    INITIAL_REVISION if it predates all of the migrations, else None.
+    """
+    def columns(table):
+        return {column['name'] for column in inspector.get_columns(table)}
+
+    if all(table.name in tables and set(table.columns.keys()) <= columns(table.name)
+           for table in db.metadata.sorted_tables):
+        return 'head'
+    if INITIAL_TABLES <= tables and 'like_count' not in columns('post') \
+            and not {'outbox_message', 'category_stats'} & tables:
+        return INITIAL_REVISION
+    return None
+
+
+@click.command('upgrade-schema')
+@with_appcontext
+def upgrade_schema():
+    """Run `flask db upgrade`, adopting databases built by db.create_all()."""
+    from flask_migrate import stamp, upgrade
+    from sqlalchemy import inspect, text
+
+    with db.engine.connect() as connection:
+        inspector = inspect(connection)
+        tables = set(inspector.get_table_names())
+        stamped = 'alembic_version' in tables and connection.execute(
+            text('SELECT version_num FROM alembic_version')).first() is not None
+        revision = None if stamped else _unrevisioned_schema(inspector, tables)
+    if not stamped and 'user' in tables:
+        # Tables exist but alembic has never run: record the schema they
+        # match as applied instead of failing on CREATE TABLE/ADD COLUMN
+        if revision is None:
+            raise click.ClickException(
+                'The database has tables but no alembic revision, and matches neither '
+                'the initial schema nor the current models. Stamp it by hand with '
+                '`flask db stamp <revision>` before upgrading.')
+        click.echo(f'Existing schema without a revision; stamping {revision}.')
+        stamp(revision=revision)
+        if revision == 'head':
+            # create_all() leaves out the search index, which a migration made
+            from app.search import search_index
+            search_index.create_schema()
+    upgrade()
+
+
+def register_commands(app):
+    app.cli.add_command(reconcile_like_counts)
+    app.cli.add_command(check_query_plans)
+    app.cli.add_command(backfill_summaries)
+    app.cli.add_command(build_assets_command)
+    app.cli.add_command(search_reindex)
+    app.cli.add_command(send_outbox)
+    app.cli.add_command(sync_sqlite_replica)
+    app.cli.add_command(seed)
+    app.cli.add_command(rebuild_category_stats)
+    app.cli.add_command(upgrade_schema)
@@ -0,0 +1,67 @@
+from sqlalchemy import event
+
+# Pragmas applied to every new SQLite connection. WAL lets readers carry on
+# while a writer commits; with WAL, synchronous=NORMAL only fsyncs at
+# checkpoints, so a power cut can lose the last commits but not corrupt the file
+SQLITE_PRAGMAS = ('journal_mode', 'synchronous', 'mmap_size', 'busy_timeout')
+
+
+def engine_options(config):
+    """Build ``SQLALCHEMY_ENGINE_OPTIONS`` from the ``DB_*`` settings."""
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    options = {'pool_pre_ping': config['DB_POOL_PRE_PING']}
+
+    if uri.startswith('sqlite'):
+        # In-memory databases use a single static connection; there is no
+        # pool to size
+        if ':memory:' not in uri and uri.rstrip('/') != 'sqlite:':
+            options.update(pool_size=config['DB_POOL_SIZE'],
+                           max_overflow=config['DB_MAX_OVERFLOW'],
+                           pool_timeout=config['DB_POOL_TIMEOUT'])
+        return options
+
+    options.update(pool_size=config['DB_POOL_SIZE'],
+                   max_overflow=config['DB_MAX_OVERFLOW'],
+                   pool_timeout=config['DB_POOL_TIMEOUT'],
+                   # Drop connections before the server or a proxy idles them out
+                   pool_recycle=config['DB_POOL_RECYCLE'])
+    if uri.startswith('postgresql') and config['DB_STATEMENT_TIMEOUT_MS']:
+        options['connect_args'] = {
+            'options': f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}"
+        }
+    return options
+
+
+def sqlite_pragmas(config):
+    return {
+        'journal_mode': config['SQLITE_JOURNAL_MODE'],
+        'synchronous': config['SQLITE_SYNCHRONOUS'],
+        'mmap_size': config['SQLITE_MMAP_SIZE'],
+        'busy_timeout': config['SQLITE_BUSY_TIMEOUT_MS'],
+    }
+
+
+def install_sqlite_pragmas(engine, pragmas):
+    """Run ``PRAGMA name=value`` for each of ``pragmas`` on every new connection."""
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name in SQLITE_PRAGMAS:
+                value = pragmas.get(name)
+                if value is not None:
+                    cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+
+def configure_engines(app):
+    """Attach per-connection setup to every engine Flask-SQLAlchemy created."""
+    from app import db
+
+    pragmas = sqlite_pragmas(app.config)
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite':
+                install_sqlite_pragmas(engine, pragmas)
@@ -0,0 +1,79 @@
+import functools
+import time
+
+from flask import g, has_request_context, session as http_session
+from flask_sqlalchemy.session import Session
+
+REPLICA_BIND = 'replica'
+# Flask session key holding the time until which reads stay on the primary
+STICKY_KEY = '_primary_until'
+
+
+class RoutingSession(Session):
+    """
+    Sends the queries of :func:`read_only` views to the ``replica`` bind.
+
+    Flushes and Core INSERT/UPDATE/DELETE statements always go to the
+    primary, as does everything outside a read-only view or when no replica
+    is configured.
+
+    To try it locally, point ``REPLICA_DATABASE_URL`` at a second SQLite
+    file and copy the primary into it with ``flask sync-sqlite-replica``;
+    changes made afterwards only show up on read-only pages once synced
+    again, except for the user who made them.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            if self._flushing or getattr(clause, 'is_dml', False):
+                g._db_wrote = True
+            elif g.get('_db_read_only'):
+                replica = self._db.engines.get(REPLICA_BIND)
+                if replica is not None:
+                    replica_router.routed += 1
+                    return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_only(view):
+    """
+    Let a view's queries be served by the replica, unless the current user
+    wrote something within the last ``REPLICA_STICKY_SECONDS`` and might
+    not see it there yet.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if http_session.get(STICKY_KEY, 0) < time.time():
+            g._db_read_only = True
+        else:
+            replica_router.pinned += 1
+        return view(*args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """Keeps a user's reads on the primary for a while after their writes."""
+
+    def __init__(self):
+        self.sticky_seconds = 10
+        self.routed = 0
+        self.pinned = 0
+
+    def init_app(self, app):
+        self.sticky_seconds = app.config.setdefault('REPLICA_STICKY_SECONDS', self.sticky_seconds)
+        if REPLICA_BIND in app.config.get('SQLALCHEMY_BINDS', {}):
+            app.after_request(self._stick_after_write)
+
+        from app.metrics import register_collector
+        register_collector('db_routing', self.stats)
+
+    def _stick_after_write(self, response):
+        if g.get('_db_wrote'):
+            http_session[STICKY_KEY] = time.time() + self.sticky_seconds
+        return response
+
+    def stats(self):
+        return {'replica_queries': self.routed, 'pinned_to_primary': self.pinned}
+
+
+replica_router = ReplicaRouter()
@@ -2,13 +2,26 @@ from functools import wraps
 from flask import abort, redirect, url_for, flash
 from flask_login import current_user
 
+
+def current_user_is_admin():
+    """
+    Whether the signed-in user is an active admin, read from the database
+    rather than the user cache's copy.
+    """
+    from app.user_cache import user_cache
+
+    if not current_user.is_authenticated:
+        return False
+    user = user_cache.refresh_access(current_user._get_current_object())
+    return user.is_active and user.is_admin
+
 def admin_required(f):
     """
     Decorator to restrict access to admin users only.
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if not current_user.is_authenticated or not current_user.is_admin:
+        if not current_user_is_admin():
             abort(403)  # Forbidden
         return f(*args, **kwargs)
     return decorated_function
@@ -25,7 +38,7 @@ def permission_required(permission_name):
                 return redirect(url_for('auth.login'))
             # Add your permission checking logic here
             # For now, just check if user is admin
-            if not current_user.is_admin:
+            if not current_user_is_admin():
                 abort(403)  # Forbidden
             return f(*args, **kwargs)
         return decorated_function
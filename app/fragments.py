@@ -0,0 +1,83 @@
+import threading
+from collections import OrderedDict
+
+from flask import render_template
+from markupsafe import Markup
+
+
+class FragmentCache:
+    """
+    Bounded LRU of rendered post-card HTML.
+
+    Entries are grouped per post and stamped with the values the markup
+    depends on (``last_updated``, the counters and the author's name and
+    avatar), so a stale stamp is a miss even if an invalidation was missed.
+    Write paths still call :meth:`invalidate` so edited posts drop out
+    immediately.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def init_app(self, app):
+        self.maxsize = app.config.setdefault('FRAGMENT_CACHE_SIZE', self.maxsize)
+        app.add_template_global(self.render_card, 'post_card')
+
+        from app.metrics import register_collector
+        register_collector('fragment_cache', self.stats)
+
+    def get(self, post_id, template, stamp):
+        with self._lock:
+            variants = self._entries.get(post_id)
+            entry = variants.get(template) if variants else None
+            if entry is None or entry[0] != stamp:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(post_id)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, post_id, template, stamp, html):
+        with self._lock:
+            self._entries.setdefault(post_id, {})[template] = (stamp, html)
+            self._entries.move_to_end(post_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, post_id):
+        with self._lock:
+            self._entries.pop(post_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+            }
+
+    def render_card(self, template, post):
+        """Template global: render ``template`` for ``post`` through the cache."""
+        # Cards show the author's name and avatar, which change without
+        # touching the post
+        stamp = (post.last_updated, post.like_count, getattr(post, 'comment_total', None),
+                 post.author.username, post.author.image_file)
+        html = self.get(post.id, template, stamp)
+        if html is None:
+            html = Markup(render_template(template, post=post))
+            self.set(post.id, template, stamp, html)
+        return html
+
+
+fragment_cache = FragmentCache()
@@ -0,0 +1,88 @@
+import hashlib
+
+from flask import abort, current_app, make_response, request, session
+from flask_login import current_user
+from werkzeug.http import is_resource_modified
+
+
+def _viewer_key():
+    # base.html renders the signed-in user's name and avatar into every page
+    if current_user.is_authenticated:
+        return f'{current_user.id}/{current_user.username}/{current_user.image_file}'
+    return 'anon'
+
+
+def make_etag(*parts):
+    return hashlib.sha1(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def conditional_response(etag_parts, last_modified, render):
+    """
+    Answer a GET with 304 Not Modified when the client's copy is current.
+
+    ``render`` is only called when the page actually has to be built. Pages
+    carrying flashed messages are always rendered so the message is shown.
+    """
+    etag = make_etag(request.full_path, _viewer_key(), *etag_parts)
+    if not session.get('_flashes') and not is_resource_modified(
+            request.environ, etag=etag, last_modified=last_modified):
+        response = current_app.response_class(status=304)
+    else:
+        response = make_response(render())
+
+    # Weak because CSRF tokens make the markup differ byte-for-byte
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.vary.add('Cookie')
+    return response
+
+
+def post_validators(post_id):
+    """
+    Return ``(etag_parts, last_modified)`` for a post page without loading
+    the post body, aborting with 404 if the post does not exist.
+    """
+    from app import db
+    from app.models import Comment, Post
+
+    # The comment thread is part of the page, so a new or removed comment
+    # has to change the validators too
+    approved = (Comment.post_id == Post.id, Comment.is_approved.is_(True))
+    comment_count = db.session.query(db.func.count(Comment.id))\
+                              .filter(*approved).correlate(Post).scalar_subquery()
+    last_comment = db.session.query(db.func.max(Comment.id))\
+                             .filter(*approved).correlate(Post).scalar_subquery()
+    row = db.session.query(Post.last_updated, Post.date_posted, Post.like_count,
+                           comment_count.label('comment_count'),
+                           last_comment.label('last_comment'))\
+                    .filter(Post.id == post_id).first()
+    if row is None:
+        abort(404)
+    last_modified = row.last_updated or row.date_posted
+    return (post_id, last_modified.isoformat(), row.like_count,
+            row.comment_count, row.last_comment), last_modified
+
+
+def listing_validators(*pages):
+    """
+    Return ``(etag_parts, last_modified)`` for a listing from the posts it
+    is about to show, so edits, counter changes and deletions anywhere in
+    the feed change the ETag. ``pages`` are paginations or plain lists of
+    feed posts.
+    """
+    etag_parts = []
+    last_modified = None
+    for page in pages:
+        items = getattr(page, 'items', page)
+        # Page-number paging shifts when any post is added or removed
+        etag_parts.append((getattr(page, 'total', None),
+                           getattr(page, 'has_next', None), getattr(page, 'has_prev', None)))
+        for post in items:
+            updated = post.last_updated or post.date_posted
+            etag_parts.append((post.id, updated.isoformat(), post.like_count,
+                               getattr(post, 'comment_total', None),
+                               post.author.username, post.author.image_file))
+            if last_modified is None or updated > last_modified:
+                last_modified = updated
+    return etag_parts, last_modified
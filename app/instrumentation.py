@@ -0,0 +1,155 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+
+from flask import (g, has_request_context, request, template_rendered, before_render_template,
+                   current_app)
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.startup import ensure_log_handler
+
+logger = logging.getLogger('app.requests')
+
+# Expanded IN lists and VALUES rows collapse to one placeholder, so the same
+# query with a different number of ids still has the same shape
+_PLACEHOLDER_LIST = re.compile(r'\(\s*(?:\?|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|:\w+))*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def statement_shape(statement):
+    return _WHITESPACE.sub(' ', _PLACEHOLDER_LIST.sub('(?)', statement)).strip()
+
+
+class RequestStats:
+    """What one request spent on SQL and templates."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.shapes = Counter()
+        self._template_depth = 0
+        self._template_started = None
+
+
+class RequestProfiler:
+    """
+    Counts the SQL statements, database time and template time of every
+    request, logs them as one JSON line on ``app.requests``, and warns when
+    a single statement shape runs more than ``N_PLUS_ONE_THRESHOLD`` times,
+    the usual sign of a lazy load in a loop.
+
+    Off unless ``PROFILE_REQUESTS`` is set. The ``Server-Timing`` header
+    is only sent in debug mode or to admins, since it reveals query counts.
+    """
+
+    def __init__(self):
+        self.threshold = 10
+        self.header = True
+        self.requests = 0
+        self.n_plus_one = 0
+        self._listening = False
+
+    def init_app(self, app):
+        self.threshold = app.config.setdefault('N_PLUS_ONE_THRESHOLD', self.threshold)
+        self.header = app.config.setdefault('SERVER_TIMING_HEADER', self.header)
+        if not app.config.setdefault('PROFILE_REQUESTS', False):
+            return
+        ensure_log_handler(logger)
+
+        if not self._listening:
+            event.listen(Engine, 'before_cursor_execute', self._before_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_execute)
+            self._listening = True
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+        from app.metrics import register_collector
+        register_collector('requests', self.stats)
+
+    @staticmethod
+    def _current():
+        # Write buffers and the outbox also run SQL, outside any request
+        if not has_request_context():
+            return None
+        return g.get('_request_stats')
+
+    def _start(self):
+        g._request_stats = RequestStats()
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self._current() is not None:
+            conn.info.setdefault('_query_started', []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        stats = self._current()
+        if stats is None or not conn.info.get('_query_started'):
+            return
+        stats.db_seconds += time.perf_counter() - conn.info['_query_started'].pop()
+        stats.queries += 1
+        stats.shapes[statement_shape(statement)] += 1
+
+    def _before_render(self, sender, template, context, **extra):
+        stats = self._current()
+        if stats is not None:
+            # Only time the outermost render; included templates are part of it
+            if stats._template_depth == 0:
+                stats._template_started = time.perf_counter()
+            stats._template_depth += 1
+
+    def _after_render(self, sender, template, context, **extra):
+        stats = self._current()
+        if stats is not None and stats._template_depth:
+            stats._template_depth -= 1
+            if stats._template_depth == 0:
+                stats.template_seconds += time.perf_counter() - stats._template_started
+
+    def _finish(self, response):
+        stats = self._current()
+        if stats is None:
+            return response
+        total = time.perf_counter() - stats.started
+        self.requests += 1
+
+        if self.header and self._may_see_timings():
+            response.headers['Server-Timing'] = ', '.join((
+                f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries"',
+                f'tpl;dur={stats.template_seconds * 1000:.1f}',
+                f'total;dur={total * 1000:.1f}',
+            ))
+
+        repeated = [(shape, count) for shape, count in stats.shapes.most_common()
+                    if count > self.threshold]
+        for shape, count in repeated:
+            self.n_plus_one += 1
+            logger.warning('Possible N+1 on %s: statement ran %d times: %s',
+                           request.endpoint, count, shape[:300])
+
+        logger.info(json.dumps({
+            'endpoint': request.endpoint,
+            'method': request.method,
+            'status': response.status_code,
+            'queries': stats.queries,
+            'db_ms': round(stats.db_seconds * 1000, 1),
+            'template_ms': round(stats.template_seconds * 1000, 1),
+            'total_ms': round(total * 1000, 1),
+            'repeated_statements': len(repeated),
+        }))
+        return response
+
+    @staticmethod
+    def _may_see_timings():
+        return current_app.debug or (current_user.is_authenticated and current_user.is_admin)
+
+    def stats(self):
+        return {'profiled': self.requests, 'n_plus_one_warnings': self.n_plus_one}
+
+
+request_profiler = RequestProfiler()
@@ -0,0 +1,160 @@
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import OrderedDict
+
+from sqlalchemy import select
+
+
+# What an entry costs besides the ids: the user id key, the (expiry, array)
+# tuple, the expiry float, the empty array object and the OrderedDict slot.
+# Without it users with no likes would be free and never evicted
+ENTRY_OVERHEAD = (sys.getsizeof(2 ** 20) + sys.getsizeof((0.0, None)) + sys.getsizeof(0.0)
+                  + sys.getsizeof(array('i')) + 100)
+
+
+def _size(post_ids):
+    return ENTRY_OVERHEAD + len(post_ids) * post_ids.itemsize
+
+
+def _find(post_ids, post_id):
+    i = bisect_left(post_ids, post_id)
+    return i, i < len(post_ids) and post_ids[i] == post_id
+
+
+class LikedPostsCache:
+    """
+    Per-process cache of the post ids each user has liked, kept as a
+    sorted ``array('i')`` (four bytes per like) so membership is a binary
+    search instead of a query against ``likes``.
+
+    A user's set is loaded with one query on first use, updated in place by
+    ``like_post`` in this process, and reloaded after ``LIKED_CACHE_TTL``
+    seconds to pick up likes made through other workers. Least recently
+    used sets are evicted once the entries together (ids plus a fixed
+    per-entry overhead) exceed ``LIKED_CACHE_MAX_BYTES``, and expired ones
+    are swept out once per TTL.
+    """
+
+    def __init__(self, ttl=60, max_bytes=32 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._next_sweep = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+
+    def init_app(self, app):
+        self.ttl = app.config.setdefault('LIKED_CACHE_TTL', self.ttl)
+        self.max_bytes = app.config.setdefault('LIKED_CACHE_MAX_BYTES', self.max_bytes)
+
+        from app.metrics import register_collector
+        register_collector('liked_cache', self.stats)
+
+    def _load(self, user_id):
+        from app import db
+        from app.models import Like
+
+        # Served entirely from the (user_id, post_id) unique index
+        post_ids = db.session.scalars(
+            select(Like.post_id).where(Like.user_id == user_id).order_by(Like.post_id))
+        return array('i', post_ids)
+
+    def _get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(user_id)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[user_id]
+                self._bytes -= _size(entry[1])
+                self.expired += 1
+            self.misses += 1
+
+        post_ids = self._load(user_id)
+        with self._lock:
+            self._store(user_id, post_ids)
+        return post_ids
+
+    def _store(self, user_id, post_ids):
+        # Called with the lock held
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._sweep(now)
+        old = self._entries.pop(user_id, None)
+        if old is not None:
+            self._bytes -= _size(old[1])
+        self._entries[user_id] = (now + self.ttl, post_ids)
+        self._bytes += _size(post_ids)
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= _size(evicted)
+            self.evictions += 1
+
+    def _sweep(self, now):
+        # Called with the lock held. Hits reorder entries without extending
+        # their expiry, so expired ones can sit anywhere in the LRU
+        expired = [user_id for user_id, (expires, _) in self._entries.items() if expires <= now]
+        for user_id in expired:
+            _, post_ids = self._entries.pop(user_id)
+            self._bytes -= _size(post_ids)
+        self.expired += len(expired)
+        self._next_sweep = now + self.ttl
+
+    def contains(self, user_id, post_id):
+        liked = self._get(user_id)
+        with self._lock:
+            return _find(liked, post_id)[1]
+
+    def liked_among(self, user_id, post_ids):
+        """The subset of ``post_ids`` the user has liked."""
+        liked = self._get(user_id)
+        with self._lock:
+            return {post_id for post_id in post_ids if _find(liked, post_id)[1]}
+
+    def update(self, user_id, post_id, liked):
+        """Record a like or unlike in the user's cached set, if it is cached."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return
+            post_ids = entry[1]
+            i, present = _find(post_ids, post_id)
+            if liked and not present:
+                insort(post_ids, post_id)
+                self._bytes += post_ids.itemsize
+            elif not liked and present:
+                del post_ids[i]
+                self._bytes -= post_ids.itemsize
+
+    def invalidate(self, user_id):
+        with self._lock:
+            old = self._entries.pop(user_id, None)
+            if old is not None:
+                self._bytes -= _size(old[1])
+
+    def stats(self):
+        with self._lock:
+            users = len(self._entries)
+            largest = max((len(e[1]) for e in self._entries.values()), default=0)
+            return {
+                'users': users,
+                'bytes': self._bytes,
+                'bytes_per_user': round(self._bytes / users, 1) if users else 0,
+                'largest_set': largest,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expired': self.expired,
+            }
+
+
+liked_cache = LikedPostsCache()
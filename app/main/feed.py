@@ -0,0 +1,82 @@
+from sqlalchemy import func
+from sqlalchemy.orm import defer, joinedload
+
+from app import db
+from app.models import Post, Comment
+from app.pagination import keyset_paginate, cached_count
+
+
+def _comment_count():
+    """Correlated per-post comment count, served by ix_comment_post_date_posted."""
+    return (
+        db.session.query(func.count(Comment.id))
+        .filter(Comment.post_id == Post.id)
+        .correlate(Post)
+        .scalar_subquery()
+    )
+
+
+def feed_query(category=None):
+    """
+    Build the listing query used by the home, blog and category pages.
+
+    Authors are joined eagerly, like counts are stored on the post and
+    comment counts come from an aggregate subquery, so rendering a page of
+    cards needs no further queries. Cards only show the stored summary, so
+    the full body is never fetched.
+    """
+    query = (
+        db.session.query(Post, _comment_count())
+        .options(joinedload(Post.author), defer(Post.content))
+        .order_by(Post.date_posted.desc())
+    )
+    if category is not None:
+        query = query.filter(Post.category == category)
+    return query
+
+
+def _attach_counts(rows):
+    posts = []
+    for post, comment_total in rows:
+        post.comment_total = comment_total
+        posts.append(post)
+    return posts
+
+
+def get_feed_page(page=1, per_page=6, category=None, error_out=True):
+    """Return a pagination of posts with ``author`` loaded and comment counts attached."""
+    pagination = feed_query(category).paginate(
+        page=page, per_page=per_page, error_out=error_out)
+    pagination.items = _attach_counts(pagination.items)
+    return pagination
+
+
+def get_latest_posts(limit, category=None, ids=None):
+    """
+    Return the newest ``limit`` posts with the same eager loading as a page,
+    optionally restricted to the given post ids.
+    """
+    query = feed_query(category)
+    if ids is not None:
+        query = query.filter(Post.id.in_(ids))
+    rows = query.limit(limit).all()
+    return _attach_counts(rows)
+
+
+def get_feed_cursor_page(cursor=None, per_page=6, category=None, with_total=False,
+                         total=None):
+    """
+    Keyset-paginated variant of :func:`get_feed_page` for deep paging.
+
+    Raises :class:`app.pagination.InvalidCursor` for a malformed token. A
+    ``total`` the caller already knows is used as-is; otherwise it is only
+    computed when asked for, and then from a short-lived cache.
+    """
+    query = feed_query(category)
+    if total is None and with_total:
+        total = cached_count(('feed', category), query)
+    pagination = keyset_paginate(
+        query, Post.date_posted, Post.id, cursor=cursor, per_page=per_page,
+        total=total, key=lambda row: (row[0].date_posted, row[0].id))
+    pagination.items = _attach_counts(pagination.items)
+    return pagination
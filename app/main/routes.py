@@ -1,33 +1,71 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, abort, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, abort, jsonify, Response, current_app
 from flask_login import login_required, current_user
 from app.models import Post, Message
 from app import db
+from app.main.feed import get_feed_page, get_feed_cursor_page, get_latest_posts
+from app.http_cache import conditional_response, listing_validators, post_validators
+from app.view_counter import view_counter
+from app.posts.comments import load_comment_threads
+from app.search import search_index
+from app.pagination import cursor_arg
+from app.fragments import fragment_cache
+from app.metrics import render_metrics
+from app.outbox import mail_outbox
+from app.db_routing import read_only
+from app.categories import category_index
+from app.decorators import current_user_is_admin
 from sqlalchemy import or_, and_, not_
 from datetime import datetime
+import hmac
 
 main = Blueprint('main', __name__)
 
 # Home/Portfolio Route
 @main.route("/")
 @main.route("/home")
+@read_only
 def home():
     page = request.args.get('page', 1, type=int)
-    # Get featured posts for the carousel/slider
-    featured_posts = Post.query.order_by(Post.date_posted.desc()).limit(3).all()
+    # One read of category_stats drives the tiles and, through the counts,
+    # the validators; read it fresh so another worker's change shows up
+    categories = category_index.all(fresh=True)
     # Get latest posts for the blog section
-    latest_posts = Post.query.order_by(Post.date_posted.desc()).paginate(page=page, per_page=6)
+    latest_posts = get_feed_page(page=page, per_page=6)
+    # Featured posts for the carousel/slider are the newest three, which
+    # page one has already loaded
+    if page == 1:
+        featured_posts = latest_posts.items[:3]
+    else:
+        featured_posts = get_latest_posts(3)
     
-    return render_template('home.html',
-                         featured_posts=featured_posts,
-                         posts=latest_posts,
-                         title='Home')
+    def render():
+        return render_template('home.html',
+                             featured_posts=featured_posts,
+                             posts=latest_posts,
+                             categories=categories[:3],
+                             title='Home')
+    
+    etag_parts, last_modified = listing_validators(latest_posts, featured_posts)
+    counts = tuple((c.category, c.post_count, c.latest_post_id) for c in categories)
+    return conditional_response((*etag_parts, counts), last_modified, render)
 
 # Blog Route
 @main.route("/blog")
+@read_only
 def blog():
-    page = request.args.get('page', 1, type=int)
-    posts = Post.query.order_by(Post.date_posted.desc()).paginate(page=page, per_page=6)
-    return render_template('blog.html', posts=posts, title='Blog')
+    page = request.args.get('page', type=int)
+    cursor = cursor_arg()
+    if page is not None:
+        posts = get_feed_page(page=page, per_page=6)
+    else:
+        # Cursor paging keeps deep pages as cheap as the first one
+        posts = get_feed_cursor_page(cursor=cursor, per_page=6)
+    
+    def render():
+        return render_template('blog.html', posts=posts, title='Blog')
+    
+    etag_parts, last_modified = listing_validators(posts)
+    return conditional_response(etag_parts, last_modified, render)
 
 # About Route
 @main.route("/about")
@@ -57,12 +95,15 @@ def contact():
             date_received=datetime.utcnow()
         )
         
-        # Save to database
+        # Save to database, queueing the notification in the same transaction
         db.session.add(new_message)
+        notify = current_app.config.get('CONTACT_NOTIFY_EMAIL')
+        if notify:
+            mail_outbox.enqueue(f'Contact form: {subject}', recipients=[notify],
+                                body=f'From: {name} <{email}>\n\n{message}')
         db.session.commit()
-        
-        # Here you would typically send an email notification
-        # send_contact_email(name, email, subject, message)
+        if notify:
+            mail_outbox.wake()
         
         return jsonify({'success': True, 'message': 'Your message has been sent successfully!'})
     
@@ -70,22 +111,63 @@ def contact():
 
 # Category Route
 @main.route('/category/<string:category_name>')
+@read_only
 def category(category_name):
-    page = request.args.get('page', 1, type=int)
+    page = request.args.get('page', type=int)
+    cursor = cursor_arg()
+    
     try:
-        # Use a more explicit query with proper SQLAlchemy syntax
-        from sqlalchemy import text
-        posts = db.session.query(Post).filter(text("post.category = :category")).params(category=category_name).order_by(Post.date_posted.desc()).paginate(page=page, per_page=6)
-        return render_template('category.html', title=f'Category: {category_name}', posts=posts, category_name=category_name)
+        if page is not None:
+            posts = get_feed_page(page=page, per_page=6, category=category_name)
+        else:
+            # The total comes from category_stats instead of a COUNT
+            stats = category_index.get(category_name, fresh=True)
+            posts = get_feed_cursor_page(cursor=cursor, per_page=6, category=category_name,
+                                         total=stats.post_count if stats else 0)
+        
+        def render():
+            return render_template('category.html', title=f'Category: {category_name}', posts=posts, category_name=category_name)
+        
+        etag_parts, last_modified = listing_validators(posts)
+        return conditional_response(etag_parts, last_modified, render)
     except Exception as e:
         print(f"Error in category route: {str(e)}")
         return str(e), 500
 
+# Search Route
+@main.route("/search")
+def search():
+    query = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = 10
+    posts = []
+    has_next = False
+    if query:
+        # Ask for one extra hit to know whether there is a next page
+        hits = search_index.search(query, limit=per_page + 1, offset=(page - 1) * per_page)
+        has_next = len(hits) > per_page
+        ranked_ids = [post_id for post_id, _ in hits[:per_page]]
+        if ranked_ids:
+            found = {post.id: post for post in
+                     get_latest_posts(len(ranked_ids), ids=ranked_ids)}
+            posts = [found[post_id] for post_id in ranked_ids if post_id in found]
+    return render_template('search.html', title='Search', query=query,
+                           posts=posts, page=page, has_next=has_next)
+
 # Blog Post Route
 @main.route("/post/<int:post_id>")
+@read_only
 def post(post_id):
-    post = Post.query.get_or_404(post_id)
-    return render_template('post.html', title=post.title, post=post)
+    etag_parts, last_modified = post_validators(post_id)
+    view_counter.record(post_id)
+    comment_page = request.args.get('comments', 1, type=int)
+    
+    def render():
+        post = Post.query.get_or_404(post_id)
+        comments = load_comment_threads(post_id, page=comment_page)
+        return render_template('post.html', title=post.title, post=post, comments=comments)
+    
+    return conditional_response(etag_parts, last_modified, render)
 
 # Delete Post Route
 @main.route("/post/<int:post_id>/delete", methods=['POST'])
@@ -96,5 +178,18 @@ def delete_post(post_id):
         abort(403)
     db.session.delete(post)
     db.session.commit()
+    fragment_cache.invalidate(post_id)
     flash('Your post has been deleted!', 'success')
     return redirect(url_for('main.blog'))
+
+# Metrics Route
+@main.route("/metrics")
+def metrics():
+    # Scrapers authenticate with METRICS_TOKEN; otherwise only admins, and
+    # everyone else gets a 404 rather than learning the endpoint exists
+    token = current_app.config.get('METRICS_TOKEN')
+    supplied = request.headers.get('Authorization', '')
+    if not (token and hmac.compare_digest(supplied, f'Bearer {token}')) and \
+            not current_user_is_admin():
+        abort(404)
+    return Response(render_metrics(), mimetype='text/plain')
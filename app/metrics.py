@@ -0,0 +1,15 @@
+_collectors = {}
+
+
+def register_collector(name, collect):
+    """Expose ``collect()``'s dict of numbers under ``name`` on ``/metrics``."""
+    _collectors[name] = collect
+
+
+def render_metrics():
+    """Render every registered collector in the Prometheus text format."""
+    lines = []
+    for name, collect in sorted(_collectors.items()):
+        for key, value in sorted(collect().items()):
+            lines.append(f'{name}_{key} {value}')
+    return '\n'.join(lines) + '\n'
@@ -2,12 +2,26 @@ from datetime import datetime, timedelta
 import secrets
 from . import db, login_manager
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
 from sqlalchemy.sql import func
+from sqlalchemy.orm import column_property
+from sqlalchemy.orm.attributes import set_committed_value
+from markupsafe import Markup
+
+# Longest excerpt any listing shows; templates truncate further as needed
+SUMMARY_LENGTH = 200
+
+
+def make_summary(html, length=SUMMARY_LENGTH):
+    """Plain-text excerpt of a post body, cut on a word boundary."""
+    text = Markup(html or '').striptags()
+    if len(text) <= length:
+        return text
+    return text[:length - 3].rsplit(' ', 1)[0] + '...'
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    from .user_cache import user_cache
+    return user_cache.get(int(user_id))
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -34,10 +48,24 @@ class User(UserMixin, db.Model):
     reset_token_expiry = db.Column(db.DateTime, nullable=True)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        from .passwords import passwords
+        self.password_hash = passwords.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        """
+        Verify ``password``, upgrading a hash made under an older policy.
+        The caller commits.
+        """
+        from .passwords import passwords
+        from .user_cache import user_cache
+        # The session may hold this user from the user cache, with access
+        # flags up to a TTL old
+        user_cache.refresh_access(self, 'password_hash')
+        if not passwords.verify(self.password_hash, password):
+            return False
+        if passwords.needs_rehash(self.password_hash):
+            self.password_hash = passwords.hash(password)
+        return True
 
     def get_reset_token(self, expires_sec=1800):
         token = secrets.token_urlsafe(32)
@@ -50,9 +78,12 @@ class User(UserMixin, db.Model):
         return f"User('{self.username}', '{self.email}')"
         
     def ping(self):
-        self.last_seen = datetime.utcnow()
-        db.session.add(self)
-        db.session.commit()
+        """Note activity; the row is written later by the last_seen buffer."""
+        from .presence import last_seen
+        now = datetime.utcnow()
+        # Show the fresh value without marking the row dirty for autoflush
+        set_committed_value(self, 'last_seen', now)
+        last_seen.touch(self.id, now)
 
 class Post(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -62,23 +93,39 @@ class Post(db.Model):
     summary = db.Column(db.Text, nullable=True)
     date_posted = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     last_updated = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    category = db.Column(db.String(50), nullable=False, default='uncategorized')
+    # active_history loads the old value before a change, so
+    # app.categories can move the post between category_stats rows
+    category = column_property(db.Column(db.String(50), nullable=False, default='uncategorized'),
+                               active_history=True)
     is_published = db.Column(db.Boolean, default=True, nullable=False)
     view_count = db.Column(db.Integer, default=0)
+    # Denormalized from ``likes``; kept in step by ``posts.likes.like_post``
+    # and repaired with ``flask reconcile-like-counts``
+    like_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     comments = db.relationship('Comment', backref='post', lazy=True, cascade='all, delete-orphan')
     likes = db.relationship('Like', backref='post', lazy='dynamic', cascade='all, delete-orphan')
     
+    # Indexes matching the listing queries: home/blog order by date, category
+    # pages filter then order, profiles list one author's published posts
+    __table_args__ = (
+        db.Index('ix_post_date_posted', 'date_posted'),
+        db.Index('ix_post_category_date_posted', 'category', 'date_posted'),
+        db.Index('ix_post_user_published_date', 'user_id', 'is_published', 'date_posted'),
+    )
+    
+    @db.validates('content')
+    def _update_summary(self, key, content):
+        # Keep the excerpt in step with the body so listings never touch content
+        self.summary = make_summary(content)
+        return content
+
     def is_liked_by(self, user):
-        """Check if a user has liked this post"""
+        """Check if a user has liked this post, from the cached liked set"""
+        from .liked_cache import liked_cache
         if not user or not user.is_authenticated:
             return False
-        return self.likes.filter_by(user_id=user.id).first() is not None
-    
-    @property
-    def like_count(self):
-        """Return the number of likes for this post"""
-        return self.likes.count()
+        return liked_cache.contains(user.id, self.id)
     
     @property
     def likers(self):
@@ -99,6 +146,11 @@ class Comment(db.Model):
     parent_id = db.Column(db.Integer, db.ForeignKey('comment.id'), nullable=True)
     replies = db.relationship('Comment', backref=db.backref('parent', remote_side=[id]), lazy=True)
 
+    __table_args__ = (
+        db.Index('ix_comment_post_date_posted', 'post_id', 'date_posted'),
+        db.Index('ix_comment_user_approved_date', 'user_id', 'is_approved', 'date_posted'),
+    )
+
     def __repr__(self):
         return f"Comment('{self.content[:50]}...', '{self.date_posted}')"
 
@@ -121,10 +173,56 @@ class Like(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     post_id = db.Column(db.Integer, db.ForeignKey('post.id', ondelete='CASCADE'), nullable=False)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    # Not nullable: the likers list pages on (timestamp, id)
+    timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    user = db.relationship('User', overlaps='liked_posts,likers')
     
-    # Add a unique constraint to prevent duplicate likes
-    __table_args__ = (db.UniqueConstraint('user_id', 'post_id', name='_user_post_uc'),)
+    # Add a unique constraint to prevent duplicate likes; the index serves
+    # the newest-first likers list on a post
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'post_id', name='_user_post_uc'),
+        db.Index('ix_likes_post_timestamp', 'post_id', 'timestamp'),
+    )
     
     def __repr__(self):
         return f"<Like user_id={self.user_id} post_id={self.post_id}>"
+
+
+class OutboxMessage(db.Model):
+    """An email waiting to be sent (or already sent) by the mail outbox."""
+    __tablename__ = 'outbox_message'
+    id = db.Column(db.Integer, primary_key=True)
+    subject = db.Column(db.String(200), nullable=False)
+    sender = db.Column(db.String(120), nullable=True)
+    # One address per line
+    recipients = db.Column(db.Text, nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    html = db.Column(db.Text, nullable=True)
+    status = db.Column(db.String(10), nullable=False, default='pending', server_default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    claim_token = db.Column(db.String(32), nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_outbox_message_status_next_attempt', 'status', 'next_attempt_at'),
+        db.Index('ix_outbox_message_claim_token', 'claim_token'),
+    )
+
+    def __repr__(self):
+        return f"<OutboxMessage {self.id} {self.status} '{self.subject}'>"
+
+
+class CategoryStats(db.Model):
+    """Post count and newest post per category, maintained by ``app.categories``."""
+    __tablename__ = 'category_stats'
+    category = db.Column(db.String(50), primary_key=True)
+    post_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Not a foreign key: the row is updated in the same flush that deletes the post
+    latest_post_id = db.Column(db.Integer, nullable=True)
+    latest_date = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<CategoryStats {self.category} posts={self.post_count}>"
@@ -0,0 +1,190 @@
+"""
+Queued email delivery.
+
+Requests only insert an ``outbox_message`` row in their own transaction; a
+background thread in each worker process claims due rows in batches and
+sends them over a single SMTP connection, retrying failures with
+exponential backoff.
+
+To watch it work locally, run a debugging SMTP server::
+
+    python -m aiosmtpd -n -l localhost:1025
+
+start the app with ``MAIL_SERVER=localhost MAIL_PORT=1025 MAIL_USE_TLS=false``
+and either wait for the worker or run ``flask send-outbox``.
+"""
+import secrets
+import smtplib
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+
+from app.background import BackgroundWorker
+
+# Ceiling on the delay between two attempts at the same message
+MAX_BACKOFF = 3600
+
+
+class MailOutbox(BackgroundWorker):
+    """Durable email queue drained by a per-process delivery thread."""
+
+    worker_name = 'mail_outbox'
+
+    def __init__(self):
+        super().__init__()
+        self.batch_size = 50
+        self.interval = 15
+        self.max_attempts = 6
+        self.backoff = 30
+        self.lease = 300
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+
+    def init_app(self, app):
+        self.app = app
+        self.batch_size = app.config.setdefault('MAIL_OUTBOX_BATCH_SIZE', self.batch_size)
+        self.interval = app.config.setdefault('MAIL_OUTBOX_INTERVAL', self.interval)
+        self.max_attempts = app.config.setdefault('MAIL_OUTBOX_MAX_ATTEMPTS', self.max_attempts)
+        self.backoff = app.config.setdefault('MAIL_OUTBOX_BACKOFF', self.backoff)
+        # A claimed message whose sender died is retried once this runs out
+        self.lease = app.config.setdefault('MAIL_OUTBOX_LEASE', self.lease)
+        if app.config.setdefault('MAIL_OUTBOX_WORKER', True):
+            app.before_request(self.start)
+
+        from app.metrics import register_collector
+        register_collector('mail_outbox', self.stats)
+
+    def enqueue(self, subject, recipients, body, html=None, sender=None):
+        """
+        Add a message to the current session. It becomes visible to the
+        delivery thread when the caller commits; call :meth:`wake` after
+        that to send it straight away.
+        """
+        from app import db
+        from app.models import OutboxMessage
+
+        message = OutboxMessage(subject=subject, recipients='\n'.join(recipients),
+                                body=body, html=html, sender=sender)
+        db.session.add(message)
+        return message
+
+    def _work(self):
+        with self.app.app_context():
+            self.deliver()
+
+    def wake(self):
+        if self.app is not None and self.app.config['MAIL_OUTBOX_WORKER']:
+            self.start()
+            super().wake()
+
+    def deliver(self):
+        """Send every due message, batch by batch. Returns the number sent."""
+        sent = 0
+        while True:
+            batch = self._claim()
+            if not batch:
+                break
+            sent += self._send_batch(batch)
+            if len(batch) < self.batch_size:
+                break
+        return sent
+
+    def _claim(self):
+        from app import db
+        from app.models import OutboxMessage
+
+        outbox = OutboxMessage.__table__
+        now = datetime.utcnow()
+        token = secrets.token_hex(16)
+        due = (outbox.c.status == 'pending', outbox.c.next_attempt_at <= now)
+        batch = select(outbox.c.id).where(*due)\
+                                   .order_by(outbox.c.next_attempt_at)\
+                                   .limit(self.batch_size)
+        # Re-checking the due condition in the UPDATE keeps two workers from
+        # claiming the same row; pushing next_attempt_at out is the lease
+        with db.engine.begin() as connection:
+            connection.execute(
+                update(outbox)
+                .where(outbox.c.id.in_(batch), *due)
+                .values(claim_token=token, attempts=outbox.c.attempts + 1,
+                        next_attempt_at=now + timedelta(seconds=self.lease))
+            )
+            return connection.execute(
+                select(outbox).where(outbox.c.claim_token == token).order_by(outbox.c.id)
+            ).all()
+
+    def _send_batch(self, rows):
+        from flask_mail import Message
+        from app import mail
+
+        delivered, failures = [], {}
+        try:
+            with mail.connect() as connection:
+                for row in rows:
+                    message = Message(row.subject, recipients=row.recipients.split('\n'),
+                                      body=row.body, html=row.html, sender=row.sender)
+                    try:
+                        connection.send(message)
+                    except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException) as e:
+                        # The server rejected this message but the session is fine
+                        failures[row.id] = e
+                    except OSError:
+                        raise
+                    except Exception as e:
+                        failures[row.id] = e
+                    else:
+                        delivered.append(row.id)
+        except OSError as e:
+            # Lost (or never got) the connection: whatever was not sent yet
+            # goes back in the queue
+            for row in rows:
+                if row.id not in failures and row.id not in delivered:
+                    failures[row.id] = e
+
+        self._record(rows, delivered, failures)
+        return len(delivered)
+
+    def _record(self, rows, delivered, failures):
+        from app import db
+        from app.models import OutboxMessage
+
+        outbox = OutboxMessage.__table__
+        now = datetime.utcnow()
+        retried = failed = 0
+        with db.engine.begin() as connection:
+            if delivered:
+                connection.execute(
+                    update(outbox)
+                    .where(outbox.c.id.in_(delivered))
+                    .values(status='sent', sent_at=now, claim_token=None, last_error=None)
+                )
+            for row in rows:
+                error = failures.get(row.id)
+                if error is None:
+                    continue
+                values = {'claim_token': None, 'last_error': str(error)[:1000]}
+                if row.attempts >= self.max_attempts:
+                    values['status'] = 'failed'
+                    failed += 1
+                else:
+                    delay = min(self.backoff * 2 ** (row.attempts - 1), MAX_BACKOFF)
+                    values['next_attempt_at'] = now + timedelta(seconds=delay)
+                    retried += 1
+                connection.execute(update(outbox).where(outbox.c.id == row.id).values(**values))
+
+        for row in rows:
+            if row.id in failures:
+                self.app.logger.warning('Sending outbox message %s failed (attempt %s): %s',
+                                        row.id, row.attempts, failures[row.id])
+        with self._lock:
+            self.sent += len(delivered)
+            self.retried += retried
+            self.failed += failed
+
+    def stats(self):
+        with self._lock:
+            return {'sent': self.sent, 'retried': self.retried, 'failed': self.failed}
+
+
+mail_outbox = MailOutbox()
@@ -0,0 +1,130 @@
+import base64
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from flask import abort, request
+from sqlalchemy import and_, or_
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination token cannot be decoded."""
+
+
+def encode_cursor(direction, key):
+    """Pack a direction ('next'/'prev') and a (datetime, id) key into a token."""
+    when, ident = key
+    payload = json.dumps([direction, when.isoformat(), ident], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        direction, when, ident = json.loads(base64.urlsafe_b64decode(padded))
+        if direction not in ('next', 'prev'):
+            raise ValueError(direction)
+        return direction, (datetime.fromisoformat(when), int(ident))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(str(e)) from e
+
+
+def cursor_arg(name='cursor'):
+    """Return the cursor query argument, aborting with 400 if it is malformed."""
+    token = request.args.get(name)
+    if token:
+        try:
+            decode_cursor(token)
+        except InvalidCursor:
+            abort(400)
+    return token
+
+
+class KeysetPagination:
+    """
+    One page of a newest-first listing, addressed by opaque cursors instead of
+    page numbers. Fetching any page costs the same as the first one since the
+    query seeks on the (sort column, id) index rather than skipping rows.
+    """
+
+    def __init__(self, items, per_page, next_cursor=None, prev_cursor=None, total=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def keyset_paginate(query, sort_column, id_column, cursor=None, per_page=10,
+                    total=None, key=None):
+    """
+    Paginate ``query`` newest-first on ``(sort_column, id_column)``.
+
+    ``key`` maps a result item to its ``(sort value, id)`` pair and defaults to
+    reading the two attributes off the item. ``total`` is passed through
+    as-is so callers can skip the COUNT entirely or supply a cached one.
+    """
+    if key is None:
+        def key(item):
+            return getattr(item, sort_column.key), getattr(item, id_column.key)
+
+    direction, after = decode_cursor(cursor) if cursor else ('next', None)
+
+    if direction == 'next':
+        if after is not None:
+            query = query.filter(or_(
+                sort_column < after[0],
+                and_(sort_column == after[0], id_column < after[1]),
+            ))
+        query = query.order_by(None).order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.filter(or_(
+            sort_column > after[0],
+            and_(sort_column == after[0], id_column > after[1]),
+        ))
+        query = query.order_by(None).order_by(sort_column.asc(), id_column.asc())
+
+    # One extra row tells us whether there is another page in this direction
+    items = query.limit(per_page + 1).all()
+    has_more = len(items) > per_page
+    items = items[:per_page]
+
+    if direction == 'next':
+        has_next, has_prev = has_more, after is not None
+    else:
+        items.reverse()
+        has_next, has_prev = True, has_more
+
+    next_cursor = encode_cursor('next', key(items[-1])) if items and has_next else None
+    prev_cursor = encode_cursor('prev', key(items[0])) if items and has_prev else None
+    return KeysetPagination(items, per_page, next_cursor, prev_cursor, total)
+
+
+# Keys can come from the URL (category names), so only the most recently
+# used ones are kept
+COUNT_CACHE_SIZE = 128
+_count_cache = OrderedDict()
+
+
+def cached_count(cache_key, query, ttl=60):
+    """Return ``query.count()``, reusing the value for ``ttl`` seconds."""
+    now = time.monotonic()
+    hit = _count_cache.get(cache_key)
+    if hit is not None and hit[1] > now:
+        _count_cache.move_to_end(cache_key)
+        return hit[0]
+    total = query.order_by(None).count()
+    _count_cache[cache_key] = (total, now + ttl)
+    _count_cache.move_to_end(cache_key)
+    while len(_count_cache) > COUNT_CACHE_SIZE:
+        _count_cache.popitem(last=False)
+    return total
@@ -0,0 +1,111 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+from werkzeug.exceptions import ServiceUnavailable
+from werkzeug.security import check_password_hash
+
+BCRYPT_PREFIXES = ('$2a$', '$2b$', '$2y$')
+# Hash prefixes written by werkzeug.security.generate_password_hash
+WERKZEUG_PREFIXES = ('pbkdf2:', 'scrypt:')
+
+
+class PasswordServiceBusy(ServiceUnavailable):
+    """Every hashing slot stayed taken for longer than the caller would wait."""
+
+    description = 'Too many sign-in attempts are being processed. Please try again shortly.'
+
+
+def hash_algorithm(hashed):
+    """Name the scheme that produced ``hashed``, or None if it is unknown."""
+    if not hashed:
+        return None
+    if hashed.startswith(BCRYPT_PREFIXES):
+        return 'bcrypt'
+    if hashed.startswith(WERKZEUG_PREFIXES):
+        return hashed.split(':', 1)[0]
+    return None
+
+
+class PasswordService:
+    """
+    Hashes and verifies passwords under one policy: bcrypt at
+    ``PASSWORD_BCRYPT_ROUNDS``.
+
+    Older hashes (Werkzeug pbkdf2/scrypt, or bcrypt at another cost) still
+    verify and report :meth:`needs_rehash`, so callers can upgrade them on
+    the next successful login. The work runs on a small thread pool whose
+    slots are capped, so a burst of logins queues for a bounded time and
+    then fails fast with 503 instead of tying up every request thread.
+    """
+
+    def __init__(self, rounds=12, workers=2, queue=8, wait=2.0):
+        self.configure(rounds, workers, queue, wait)
+        self.rejected = 0
+
+    def configure(self, rounds, workers, queue, wait):
+        self.rounds = rounds
+        self.workers = workers
+        self.queue = queue
+        self.wait = wait
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='passwords')
+        # Running plus waiting jobs; anything beyond that is turned away
+        self._slots = threading.BoundedSemaphore(workers + queue)
+        self._dummy_hash = None
+
+    def init_app(self, app):
+        self.configure(
+            rounds=app.config.setdefault('PASSWORD_BCRYPT_ROUNDS', self.rounds),
+            workers=app.config.setdefault('PASSWORD_HASH_WORKERS', self.workers),
+            queue=app.config.setdefault('PASSWORD_HASH_QUEUE', self.queue),
+            wait=app.config.setdefault('PASSWORD_HASH_WAIT', self.wait),
+        )
+
+        from app.metrics import register_collector
+        register_collector('passwords', self.stats)
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.wait):
+            self.rejected += 1
+            raise PasswordServiceBusy(retry_after=1)
+        try:
+            return self._executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(self._hash, password)
+
+    def _hash(self, password):
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(self.rounds)).decode('ascii')
+
+    def verify(self, hashed, password):
+        """
+        Check ``password`` against ``hashed``. A missing hash is compared
+        against a throwaway one so unknown accounts take as long to reject
+        as wrong passwords.
+        """
+        if hash_algorithm(hashed) is None:
+            if self._dummy_hash is None:
+                self._dummy_hash = self.hash('not a real password')
+            self._run(self._verify, self._dummy_hash, password)
+            return False
+        return self._run(self._verify, hashed, password)
+
+    @staticmethod
+    def _verify(hashed, password):
+        if hash_algorithm(hashed) == 'bcrypt':
+            return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('ascii'))
+        return check_password_hash(hashed, password)
+
+    def needs_rehash(self, hashed):
+        if hash_algorithm(hashed) != 'bcrypt':
+            return True
+        # $2b$<cost>$<salt+digest>
+        return int(hashed.split('$')[2]) != self.rounds
+
+    def stats(self):
+        return {'rounds': self.rounds, 'rejected': self.rejected}
+
+
+passwords = PasswordService()
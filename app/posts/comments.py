@@ -0,0 +1,82 @@
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.models import Comment
+
+THREADS_PER_PAGE = 20
+MAX_REPLY_DEPTH = 3
+
+
+class CommentThreads:
+    """One page of top-level comment threads with their replies attached."""
+
+    def __init__(self, threads, page, per_page, total_threads, total_comments):
+        self.threads = threads
+        self.page = page
+        self.per_page = per_page
+        self.total_threads = total_threads
+        self.total_comments = total_comments
+
+    @property
+    def has_prev(self):
+        return self.page > 1
+
+    @property
+    def has_next(self):
+        return self.page * self.per_page < self.total_threads
+
+
+def _attach(comment, children, depth, max_depth):
+    replies = children.get(comment.id, [])
+    comment.hidden_replies = 0
+    if depth >= max_depth:
+        # Count what is cut off so the template can say how much is hidden
+        comment.hidden_replies = _count_descendants(comment.id, children)
+        replies = []
+    for reply in replies:
+        _attach(reply, children, depth + 1, max_depth)
+    # Fill the relationship without a lazy load, so walking it in the
+    # template never goes back to the database
+    set_committed_value(comment, 'replies', replies)
+
+
+def _count_descendants(comment_id, children):
+    stack = list(children.get(comment_id, ()))
+    count = 0
+    while stack:
+        reply = stack.pop()
+        count += 1
+        stack.extend(children.get(reply.id, ()))
+    return count
+
+
+def load_comment_threads(post_id, page=1, per_page=THREADS_PER_PAGE, max_depth=MAX_REPLY_DEPTH):
+    """
+    Load a post's approved comments and assemble the reply tree in memory.
+
+    All comments come back in one query over the (post_id, date_posted)
+    index, with their authors joined in, however deep the threads go.
+    Top-level threads are paginated oldest first and replies nested deeper
+    than ``max_depth`` are folded into ``hidden_replies``.
+    """
+    comments = Comment.query\
+        .filter(Comment.post_id == post_id, Comment.is_approved.is_(True))\
+        .options(joinedload(Comment.author))\
+        .order_by(Comment.date_posted, Comment.id)\
+        .all()
+
+    by_id = {comment.id: comment for comment in comments}
+    roots, children = [], {}
+    for comment in comments:
+        if comment.parent_id in by_id:
+            children.setdefault(comment.parent_id, []).append(comment)
+        else:
+            # Replies whose parent is unapproved or gone are shown as threads
+            roots.append(comment)
+
+    page = max(page, 1)
+    threads = roots[(page - 1) * per_page:page * per_page]
+    for thread in threads:
+        _attach(thread, children, 1, max_depth)
+
+    return CommentThreads(threads, page, per_page, len(roots), len(comments))
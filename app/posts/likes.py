@@ -1,47 +1,168 @@
-from flask import jsonify, request, flash, redirect, url_for
+from datetime import datetime
+
+from flask import jsonify, request, flash, redirect, url_for, abort
 from flask_login import current_user, login_required
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 from . import posts_bp
 from ..models import Post, Like, db
+from ..pagination import keyset_paginate, cursor_arg
+from ..fragments import fragment_cache
+from ..liked_cache import liked_cache
+from ..db_routing import read_only
+
+def _insert_like(user_id, post_id):
+    """INSERT the like unless it exists; True if this statement created it."""
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    statement = insert(Like.__table__)\
+        .values(user_id=user_id, post_id=post_id, timestamp=datetime.utcnow())\
+        .on_conflict_do_nothing(index_elements=['user_id', 'post_id'])\
+        .returning(Like.__table__.c.id)
+    return db.session.execute(statement).first() is not None
+
+
+def _delete_like(user_id, post_id):
+    """DELETE the like if it exists; True if this statement removed it."""
+    likes = Like.__table__
+    statement = delete(likes)\
+        .where(likes.c.user_id == user_id, likes.c.post_id == post_id)\
+        .returning(likes.c.id)
+    return db.session.execute(statement).first() is not None
+
+
+def set_like(user_id, post_id, liked=None):
+    """
+    Like (``liked=True``), unlike (``False``) or toggle (``None``) a post.
+
+    Returns ``(liked, like_count)``, or None if the post does not exist.
+    Each step is a single conditional statement with RETURNING, so two
+    requests racing on the same like cannot both insert it (no unique
+    constraint error) and the counter only moves for the one that changed
+    a row. Asking for a state that already holds changes nothing.
+    """
+    post = Post.__table__
+    try:
+        if liked is None:
+            changed = _delete_like(user_id, post_id)
+            liked = not changed and _insert_like(user_id, post_id)
+            changed = changed or liked
+            if not changed:
+                # Someone else's request liked it between our two statements
+                liked = True
+        else:
+            changed = _insert_like(user_id, post_id) if liked else _delete_like(user_id, post_id)
+    except IntegrityError:
+        # Foreign key violation: the post does not exist
+        db.session.rollback()
+        return None
+
+    if changed:
+        # Bump the stored counter in the same transaction as the like row,
+        # leaving last_updated alone since the post itself did not change
+        count = db.session.execute(
+            update(post)
+            .where(post.c.id == post_id)
+            .values(like_count=post.c.like_count + (1 if liked else -1),
+                    last_updated=post.c.last_updated)
+            .returning(post.c.like_count)
+        ).scalar()
+    else:
+        count = db.session.execute(
+            select(post.c.like_count).where(post.c.id == post_id)).scalar()
+
+    if count is None:
+        db.session.rollback()
+        return None
+    db.session.commit()
+    liked_cache.update(user_id, post_id, liked)
+    return liked, count
+
 
 @posts_bp.route('/like/<int:post_id>', methods=['POST'])
 @login_required
 def like_post(post_id):
-    post = Post.query.get_or_404(post_id)
-    
-    # Check if user already liked the post
-    like = Like.query.filter_by(user_id=current_user.id, post_id=post.id).first()
-    
-    if like:
-        # Unlike the post
-        db.session.delete(like)
-        db.session.commit()
-        liked = False
-    else:
-        # Like the post
-        like = Like(user_id=current_user.id, post_id=post.id)
-        db.session.add(like)
-        db.session.commit()
-        liked = True
+    # Clients send the state they want, which makes retries and double
+    # clicks harmless; without it the like is toggled
+    wanted = (request.get_json(silent=True) or {}).get('liked')
+    result = set_like(current_user.id, post_id,
+                      liked=wanted if isinstance(wanted, bool) else None)
+    if result is None:
+        abort(404)
+    liked, like_count = result
+    fragment_cache.invalidate(post_id)
     
     # Return JSON response for AJAX requests
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         return jsonify({
             'liked': liked,
-            'likes_count': post.likes.count()
+            'likes_count': like_count
         })
     
     flash('Post liked!', 'success' if liked else 'info')
-    return redirect(url_for('posts.post', post_id=post.id))
+    return redirect(url_for('posts.post', post_id=post_id))
+
+# Upper bound on ids per /likes/state request; a listing page shows far fewer
+MAX_LIKE_STATE_IDS = 100
+
+
+@posts_bp.route('/likes/state')
+@read_only
+def like_state():
+    """
+    Like counts, and whether the caller liked each post, for ``?ids=1,2,3``.
+
+    Counts come from one query on post ids; liked flags from the caller's
+    cached liked set.
+    """
+    try:
+        post_ids = {int(i) for i in request.args.get('ids', '').split(',') if i.strip()}
+    except ValueError:
+        abort(400)
+    if len(post_ids) > MAX_LIKE_STATE_IDS:
+        abort(400)
+
+    rows = db.session.query(Post.id, Post.like_count)\
+                     .filter(Post.id.in_(post_ids)).all() if post_ids else []
+    liked = set()
+    if current_user.is_authenticated:
+        liked = liked_cache.liked_among(current_user.id, post_ids)
+
+    response = jsonify({
+        'authenticated': current_user.is_authenticated,
+        'posts': {
+            str(post_id): {'likes_count': like_count, 'liked': post_id in liked}
+            for post_id, like_count in rows
+        },
+    })
+    # Per-user answer: never store it in a shared cache
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
 
 @posts_bp.route('/post/<int:post_id>/likes')
+@read_only
 def post_likes(post_id):
     post = Post.query.get_or_404(post_id)
-    page = request.args.get('page', 1, type=int)
-    likes = post.likes.order_by(Like.timestamp.desc()).paginate(
-        page=page, per_page=10, error_out=False)
+    page = request.args.get('page', type=int)
+    query = post.likes.options(joinedload(Like.user))
+    if page is not None:
+        likes = query.order_by(Like.timestamp.desc()).paginate(
+            page=page, per_page=10, error_out=False, count=False)
+        next_cursor = prev_cursor = None
+    else:
+        likes = keyset_paginate(query, Like.timestamp, Like.id,
+                                cursor=cursor_arg(), per_page=10)
+        next_cursor, prev_cursor = likes.next_cursor, likes.prev_cursor
     
     return jsonify({
-        'likes_count': likes.total,
+        'likes_count': post.like_count,
+        'next_cursor': next_cursor,
+        'prev_cursor': prev_cursor,
         'likes': [{
             'username': like.user.username,
             'profile_url': url_for('user.profile', username=like.user.username),
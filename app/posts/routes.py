@@ -1,11 +1,15 @@
 from flask import (render_template, url_for, flash,
-                   redirect, request, abort, Blueprint)
+                   redirect, request, abort)
 from flask_login import current_user, login_required
 from app import db
 from app.models import Post
+from app.posts import posts_bp as posts
 from app.posts.forms import PostForm
-
-posts = Blueprint('posts', __name__)
+from app.fragments import fragment_cache
+from app.http_cache import conditional_response, post_validators
+from app.view_counter import view_counter
+from app.posts.comments import load_comment_threads
+from app.db_routing import read_only
 
 @posts.route("/post/new", methods=['GET', 'POST'])
 @login_required
@@ -15,15 +19,25 @@ def new_post():
         post = Post(title=form.title.data, content=form.content.data, author=current_user)
         db.session.add(post)
         db.session.commit()
+        fragment_cache.invalidate(post.id)
         flash('Your post has been created!', 'success')
         return redirect(url_for('main.home'))
     return render_template('create_post.html', title='New Post',
                            form=form, legend='New Post')
 
 @posts.route("/post/<int:post_id>")
+@read_only
 def post(post_id):
-    post = Post.query.get_or_404(post_id)
-    return render_template('post.html', title=post.title, post=post)
+    etag_parts, last_modified = post_validators(post_id)
+    view_counter.record(post_id)
+    comment_page = request.args.get('comments', 1, type=int)
+    
+    def render():
+        post = Post.query.get_or_404(post_id)
+        comments = load_comment_threads(post_id, page=comment_page)
+        return render_template('post.html', title=post.title, post=post, comments=comments)
+    
+    return conditional_response(etag_parts, last_modified, render)
 
 @posts.route("/post/<int:post_id>/update", methods=['GET', 'POST'])
 @login_required
@@ -36,6 +50,7 @@ def update_post(post_id):
         post.title = form.title.data
         post.content = form.content.data
         db.session.commit()
+        fragment_cache.invalidate(post.id)
         flash('Your post has been updated!', 'success')
         return redirect(url_for('posts.post', post_id=post.id))
     elif request.method == 'GET':
@@ -52,5 +67,6 @@ def delete_post(post_id):
         abort(403)
     db.session.delete(post)
     db.session.commit()
+    fragment_cache.invalidate(post_id)
     flash('Your post has been deleted!', 'success')
     return redirect(url_for('main.home'))
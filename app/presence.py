@@ -0,0 +1,102 @@
+import time
+from datetime import datetime
+
+from flask import request
+from flask_login import current_user
+from sqlalchemy import case, update
+
+from app.write_buffer import WriteBuffer
+
+
+class LastSeenBuffer(WriteBuffer):
+    """
+    Coalesces ``User.last_seen`` updates.
+
+    Activity is noted in memory on every request; each user's row is written
+    at most once per ``LAST_SEEN_WINDOW`` seconds, with all due users sent in
+    one UPDATE, so read traffic no longer commits a row lock per page view.
+    """
+
+    config_prefix = 'LAST_SEEN'
+    flush_interval = 60
+    # Requests that say nothing about a visitor's activity; skipping them
+    # also spares them the user loader and the buffer lock
+    IGNORED_ENDPOINTS = frozenset({'static', 'main.metrics'})
+
+    def __init__(self):
+        super().__init__()
+        self.window = 300
+        self._pending = {}
+        self._last_write = {}
+        self.written = 0
+
+    def init_app(self, app):
+        super().init_app(app)
+        self.window = app.config.setdefault('LAST_SEEN_WINDOW', self.window)
+        app.before_request(self._touch_current_user)
+
+        from app.metrics import register_collector
+        register_collector('last_seen', self.stats)
+
+    def _touch_current_user(self):
+        if request.endpoint is None or request.endpoint in self.IGNORED_ENDPOINTS:
+            return
+        if current_user.is_authenticated:
+            self.touch(current_user.id)
+
+    def touch(self, user_id, when=None):
+        with self._lock:
+            self._ensure_worker()
+            self._pending[user_id] = when or datetime.utcnow()
+
+    def _take(self):
+        # Only users whose row is older than the window are due; the rest
+        # stay pending and are picked up by a later flush
+        now = time.monotonic()
+        due = {
+            user_id: seen for user_id, seen in self._pending.items()
+            if now - self._last_write.get(user_id, float('-inf')) >= self.window
+        }
+        for user_id in due:
+            del self._pending[user_id]
+        return due
+
+    def _restore(self, batch):
+        for user_id, seen in batch.items():
+            self._pending.setdefault(user_id, seen)
+
+    def _write(self, connection, batch):
+        from app.models import User
+
+        user = User.__table__
+        connection.execute(
+            update(user)
+            .where(user.c.id.in_(list(batch)))
+            .values(last_seen=case(batch, value=user.c.id, else_=user.c.last_seen))
+        )
+
+    def _written(self, batch):
+        now = time.monotonic()
+        with self._lock:
+            for user_id in batch:
+                self._last_write[user_id] = now
+            # Forget users whose window has long passed to keep this bounded
+            stale = [user_id for user_id, at in self._last_write.items()
+                     if now - at > 2 * self.window and user_id not in self._pending]
+            for user_id in stale:
+                del self._last_write[user_id]
+            self.written += len(batch)
+
+    def flush_at_exit(self):
+        # Nothing should be held back by the window when the worker goes away
+        with self._lock:
+            self._last_write.clear()
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+        return {'pending': pending, 'written': self.written, 'flush_errors': self.flush_errors}
+
+
+last_seen = LastSeenBuffer()
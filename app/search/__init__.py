@@ -0,0 +1 @@
+from .index import SearchIndex, search_index  # noqa
@@ -0,0 +1,163 @@
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+from sqlalchemy import text
+
+# Relative weight of each indexed field when ranking
+FIELD_WEIGHTS = {'title': 10.0, 'summary': 5.0, 'body': 1.0}
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(value):
+    return _TOKEN_RE.findall((value or '').lower())
+
+
+class SQLiteFTSBackend:
+    """FTS5 virtual table ``post_search`` keyed by post id, ranked with bm25()."""
+
+    def create_schema(self, session):
+        session.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS post_search USING fts5("
+            "title, summary, body, tokenize='porter unicode61')"))
+
+    def index(self, session, post_id, fields):
+        session.execute(text('DELETE FROM post_search WHERE rowid = :id'), {'id': post_id})
+        session.execute(
+            text('INSERT INTO post_search (rowid, title, summary, body) '
+                 'VALUES (:id, :title, :summary, :body)'),
+            dict(fields, id=post_id))
+
+    def remove(self, session, post_id):
+        session.execute(text('DELETE FROM post_search WHERE rowid = :id'), {'id': post_id})
+
+    def clear(self, session):
+        session.execute(text('DELETE FROM post_search'))
+
+    def search(self, session, query, limit, offset):
+        terms = tokenize(query)
+        if not terms:
+            return []
+        # Quote every term so user input cannot inject FTS5 query syntax
+        match = ' '.join('"%s"' % term for term in terms)
+        weights = ', '.join(str(w) for w in FIELD_WEIGHTS.values())
+        rows = session.execute(
+            text(f'SELECT rowid, bm25(post_search, {weights}) AS score FROM post_search '
+                 'WHERE post_search MATCH :match ORDER BY score LIMIT :limit OFFSET :offset'),
+            {'match': match, 'limit': limit, 'offset': offset})
+        # bm25() is lower-is-better; flip it so callers can sort descending
+        return [(row.rowid, -row.score) for row in rows]
+
+
+class PostgresBackend:
+    """``post_search`` table holding a weighted tsvector behind a GIN index."""
+
+    def create_schema(self, session):
+        session.execute(text(
+            'CREATE TABLE IF NOT EXISTS post_search ('
+            'post_id INTEGER PRIMARY KEY REFERENCES post (id) ON DELETE CASCADE, '
+            'document TSVECTOR NOT NULL)'))
+        session.execute(text(
+            'CREATE INDEX IF NOT EXISTS ix_post_search_document '
+            'ON post_search USING GIN (document)'))
+
+    _DOCUMENT = ("setweight(to_tsvector('english', :title), 'A') || "
+                 "setweight(to_tsvector('english', :summary), 'B') || "
+                 "setweight(to_tsvector('english', :body), 'D')")
+
+    def index(self, session, post_id, fields):
+        session.execute(
+            text(f'INSERT INTO post_search (post_id, document) VALUES (:id, {self._DOCUMENT}) '
+                 'ON CONFLICT (post_id) DO UPDATE SET document = EXCLUDED.document'),
+            dict(fields, id=post_id))
+
+    def remove(self, session, post_id):
+        session.execute(text('DELETE FROM post_search WHERE post_id = :id'), {'id': post_id})
+
+    def clear(self, session):
+        session.execute(text('DELETE FROM post_search'))
+
+    def search(self, session, query, limit, offset):
+        # ts_rank_cd with length normalisation (flag 1) is the closest
+        # built-in to BM25's document-length damping
+        rows = session.execute(
+            text("SELECT post_id, ts_rank_cd(document, q, 1) AS score "
+                 "FROM post_search, websearch_to_tsquery('english', :query) q "
+                 "WHERE document @@ q ORDER BY score DESC LIMIT :limit OFFSET :offset"),
+            {'query': query, 'limit': limit, 'offset': offset})
+        return [(row.post_id, row.score) for row in rows]
+
+
+class MemoryBackend:
+    """
+    Pure-Python inverted index with BM25F-style scoring, for tests and for
+    databases without a native full-text engine. Per-process and not
+    persistent; rebuild it with ``flask search-reindex``.
+    """
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = defaultdict(dict)  # term -> {post_id: weighted tf}
+        self._lengths = {}  # post_id -> weighted document length
+        self._terms = {}  # post_id -> terms, for removal
+
+    def create_schema(self, session):
+        pass
+
+    def index(self, session, post_id, fields):
+        weighted = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            for term in tokenize(fields.get(field)):
+                weighted[term] += weight
+        with self._lock:
+            self._remove(post_id)
+            for term, tf in weighted.items():
+                self._postings[term][post_id] = tf
+            self._lengths[post_id] = sum(weighted.values())
+            self._terms[post_id] = list(weighted)
+
+    def _remove(self, post_id):
+        for term in self._terms.pop(post_id, ()):
+            postings = self._postings[term]
+            postings.pop(post_id, None)
+            if not postings:
+                del self._postings[term]
+        self._lengths.pop(post_id, None)
+
+    def remove(self, session, post_id):
+        with self._lock:
+            self._remove(post_id)
+
+    def clear(self, session):
+        with self._lock:
+            self._postings.clear()
+            self._lengths.clear()
+            self._terms.clear()
+
+    def search(self, session, query, limit, offset):
+        terms = set(tokenize(query))
+        with self._lock:
+            n = len(self._lengths)
+            if not n or not terms:
+                return []
+            avg_len = sum(self._lengths.values()) / n
+            candidates = None
+            for term in terms:
+                # Every term must match, like the FTS5 and tsquery backends
+                ids = set(self._postings.get(term, ()))
+                candidates = ids if candidates is None else candidates & ids
+            scores = {}
+            for term in terms:
+                postings = self._postings.get(term, {})
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for post_id in candidates:
+                    tf = postings[post_id]
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[post_id] / avg_len)
+                    scores[post_id] = scores.get(post_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+        return ranked[offset:offset + limit]
@@ -0,0 +1,113 @@
+from markupsafe import Markup
+from sqlalchemy import event, inspect
+
+from .backends import SQLiteFTSBackend, PostgresBackend, MemoryBackend
+
+
+def _backend_for(uri, name):
+    if name == 'auto':
+        if uri.startswith('sqlite'):
+            name = 'sqlite'
+        elif uri.startswith('postgresql'):
+            name = 'postgres'
+        else:
+            name = 'memory'
+    return {
+        'sqlite': SQLiteFTSBackend,
+        'postgres': PostgresBackend,
+        'memory': MemoryBackend,
+    }[name]()
+
+
+class SearchIndex:
+    """
+    Full-text index over post title, summary and tag-stripped body.
+
+    The backend follows ``SQLALCHEMY_DATABASE_URI`` (SQLite FTS5 or Postgres
+    tsvector) unless ``SEARCH_BACKEND`` names one explicitly. Database
+    backends write on the flush's connection, so an index update commits
+    or rolls back together with the post change that caused it.
+
+    Like ``category_stats``, the index follows ``Post`` mapper events, so
+    posts removed by a cascade (deleting their author) leave it too.
+    """
+
+    # Post columns that feed the indexed fields
+    INDEXED_COLUMNS = ('title', 'summary', 'content')
+
+    def __init__(self):
+        self.backend = None
+        self._listening = False
+
+    def init_app(self, app):
+        from app.models import Post
+
+        name = app.config.setdefault('SEARCH_BACKEND', 'auto')
+        self.backend = _backend_for(app.config['SQLALCHEMY_DATABASE_URI'], name)
+        if not self._listening:
+            event.listen(Post, 'after_insert', self._after_insert)
+            event.listen(Post, 'after_update', self._after_update)
+            event.listen(Post, 'after_delete', self._after_delete)
+            self._listening = True
+
+    # Mapper events; ``connection`` is the one the flush is running on
+
+    def _after_insert(self, mapper, connection, post):
+        self.backend.index(connection, post.id, self._fields(post))
+
+    def _after_update(self, mapper, connection, post):
+        state = inspect(post)
+        if any(state.attrs[column].history.has_changes() for column in self.INDEXED_COLUMNS):
+            self.backend.index(connection, post.id, self._fields(post))
+
+    def _after_delete(self, mapper, connection, post):
+        self.backend.remove(connection, post.id)
+
+    def create_schema(self):
+        """Create the index structures if missing, alongside ``db.create_all()``."""
+        from app import db
+        self.backend.create_schema(db.session)
+        db.session.commit()
+
+    @staticmethod
+    def _fields(post):
+        return {
+            'title': post.title or '',
+            'summary': post.summary or '',
+            'body': Markup(post.content or '').striptags(),
+        }
+
+    def index(self, post):
+        from app import db
+        self.backend.index(db.session, post.id, self._fields(post))
+
+    def remove(self, post_id):
+        from app import db
+        self.backend.remove(db.session, post_id)
+
+    def search(self, query, limit=10, offset=0):
+        """Return ``(post_id, score)`` pairs, best match first."""
+        from app import db
+        return self.backend.search(db.session, query, limit, offset)
+
+    def reindex(self, batch_size=500):
+        """Rebuild the whole index from the post table; returns the count."""
+        from app import db
+        from app.models import Post
+
+        self.backend.clear(db.session)
+        total = 0
+        last_id = 0
+        while True:
+            posts = Post.query.filter(Post.id > last_id).order_by(Post.id).limit(batch_size).all()
+            if not posts:
+                break
+            for post in posts:
+                self.index(post)
+            db.session.commit()
+            last_id = posts[-1].id
+            total += len(posts)
+        return total
+
+
+search_index = SearchIndex()
@@ -0,0 +1,142 @@
+"""
+Synthetic dataset for load tests and benchmarks.
+
+Rows are generated from a seeded RNG and written with executemany INSERTs
+in chunks, with primary keys assigned up front so comments can point at
+their parents without reading anything back.
+"""
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+
+from app import db
+from app.models import Comment, Like, Post, User, make_summary
+
+CATEGORIES = ('fashion', 'beauty', 'lifestyle', 'travel', 'food', 'wellness')
+WORDS = (
+    'style spring outfit color wardrobe trend classic modern linen denim '
+    'skincare routine glow travel weekend city guide recipe market morning '
+    'simple minimal layered bold texture pattern vintage season essentials '
+    'coffee journal garden sunset ocean mountain studio design craft story'
+).split()
+# Every seeded user can sign in with this password
+SEED_PASSWORD = 'benchmark'
+
+CHUNK_SIZE = 5000
+
+
+def _sentence(rng, low, high):
+    words = rng.choices(WORDS, k=rng.randint(low, high))
+    return ' '.join(words).capitalize()
+
+
+def _insert_chunks(table, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= CHUNK_SIZE:
+            db.session.execute(insert(table), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(table), batch)
+
+
+def _next_id(model):
+    return (db.session.scalar(select(func.max(model.id))) or 0) + 1
+
+
+def seed_database(users=10_000, posts=100_000, likes=1_000_000, comments=300_000,
+                  seed=42, echo=print):
+    """Append a synthetic dataset to the current database and commit it."""
+    from app.passwords import passwords
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    span = timedelta(days=730).total_seconds()
+    password_hash = passwords.hash(SEED_PASSWORD)
+
+    first_user = _next_id(User)
+    user_ids = range(first_user, first_user + users)
+    _insert_chunks(User.__table__, ({
+        'id': uid,
+        'username': f'user{uid}',
+        'email': f'user{uid}@example.com',
+        'image_file': 'default.jpg',
+        'password_hash': password_hash,
+        'member_since': now - timedelta(seconds=rng.random() * span),
+        'last_seen': now - timedelta(seconds=rng.random() * span / 10),
+        'is_admin': False,
+        'is_active': True,
+    } for uid in user_ids))
+    echo(f'Inserted {users} users.')
+
+    # A few prolific authors write most posts, as on a real blog
+    authors = rng.sample(list(user_ids), k=max(1, users // 20))
+    first_post = _next_id(Post)
+    post_ids = range(first_post, first_post + posts)
+    # Zipf-like popularity decides how many likes each post gets
+    weights = [1 / (rank + 1) ** 0.8 for rank in range(posts)]
+    rng.shuffle(weights)
+    scale = min(likes, posts * users) / sum(weights)
+    like_counts = [min(users, int(w * scale)) for w in weights]
+
+    def post_rows():
+        for pid, like_count in zip(post_ids, like_counts):
+            posted = now - timedelta(seconds=rng.random() * span)
+            content = ''.join(f'<p>{_sentence(rng, 25, 60)}.</p>' for _ in range(rng.randint(3, 8)))
+            yield {
+                'id': pid,
+                'title': _sentence(rng, 3, 8)[:100],
+                'slug': f'post-{pid}',
+                'content': content,
+                'summary': make_summary(content),
+                'date_posted': posted,
+                'last_updated': posted,
+                'category': rng.choice(CATEGORIES),
+                'is_published': rng.random() > 0.05,
+                'view_count': rng.randint(0, 5000),
+                'like_count': like_count,
+                'user_id': rng.choice(authors),
+            }
+
+    _insert_chunks(Post.__table__, post_rows())
+    echo(f'Inserted {posts} posts.')
+
+    def like_rows():
+        for pid, like_count in zip(post_ids, like_counts):
+            for uid in rng.sample(user_ids, k=like_count):
+                yield {'user_id': uid, 'post_id': pid,
+                       'timestamp': now - timedelta(seconds=rng.random() * span)}
+
+    _insert_chunks(Like.__table__, like_rows())
+    echo(f'Inserted {sum(like_counts)} likes.')
+
+    def comment_rows():
+        next_id = _next_id(Comment)
+        # (comment id, post id, depth) of recent comments that can get replies
+        recent = []
+        for _ in range(comments):
+            pid, parent, depth = rng.choice(post_ids), None, 1
+            if recent and rng.random() < 0.4:
+                parent_id, parent_post, parent_depth = rng.choice(recent)
+                if parent_depth < 4:
+                    pid, parent, depth = parent_post, parent_id, parent_depth + 1
+            yield {
+                'id': next_id,
+                'content': _sentence(rng, 5, 40) + '.',
+                'date_posted': now - timedelta(seconds=rng.random() * span),
+                'is_approved': rng.random() > 0.02,
+                'user_id': rng.choice(user_ids),
+                'post_id': pid,
+                'parent_id': parent,
+            }
+            recent.append((next_id, pid, depth))
+            if len(recent) > 200:
+                recent.pop(0)
+            next_id += 1
+
+    _insert_chunks(Comment.__table__, comment_rows())
+    echo(f'Inserted {comments} comments.')
+
+    db.session.commit()
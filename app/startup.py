@@ -0,0 +1,71 @@
+import logging
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+
+def ensure_log_handler(target, level=logging.INFO):
+    """
+    Give ``target`` its own level and a stderr handler. Outside debug mode
+    nothing configures logging, so INFO records would otherwise fall through
+    to the root logger's WARNING default and be dropped.
+    """
+    target.setLevel(level)
+    if not target.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        target.addHandler(handler)
+        # Printed here already; don't repeat it through a configured root
+        target.propagate = False
+
+
+class BootTimer:
+    """Wall-clock time spent in each phase of ``create_app()``."""
+
+    def __init__(self):
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - started
+
+    @property
+    def total(self):
+        return sum(self.phases.values())
+
+    def report(self, app):
+        """Log the timings and publish them on ``/metrics``."""
+        from app.metrics import register_collector
+
+        app.extensions['boot_timings'] = self
+        register_collector('startup', self.stats)
+        ensure_log_handler(logger)
+        logger.info('App created in %.1f ms (%s)', self.total * 1000, ', '.join(
+            f'{name} {seconds * 1000:.1f} ms' for name, seconds in self.phases.items()))
+
+    def stats(self):
+        stats = {f'{name}_seconds': round(seconds, 6) for name, seconds in self.phases.items()}
+        stats['total_seconds'] = round(self.total, 6)
+        return stats
+
+
+def dispose_engines(app):
+    """
+    Drop pooled connections inherited from the parent process.
+
+    Called from gunicorn's ``post_fork`` when the app is preloaded, so no
+    two workers ever share a socket the master opened during startup.
+    """
+    from app import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            # close=False leaves the parent's connections alone
+            engine.dispose(close=False)
@@ -204,6 +204,72 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
     
+    // Like buttons are rendered without the viewer's state so the markup
+    // stays cacheable; fill it in for every card with one request
+    const postLikeButtons = document.querySelectorAll('.like-button[data-post-id]');
+    if (postLikeButtons.length) {
+        hydrateLikes(postLikeButtons);
+        postLikeButtons.forEach(button => button.addEventListener('click', toggleLike));
+    }
+    
+    function setLikeState(postId, liked, count) {
+        document.querySelectorAll(`.like-button[data-post-id="${postId}"]`).forEach(button => {
+            const icon = button.querySelector('i');
+            icon.classList.toggle('bi-heart', !liked);
+            icon.classList.toggle('bi-heart-fill', liked);
+            icon.classList.toggle('text-danger', liked);
+            button.dataset.liked = liked ? 'true' : 'false';
+            const counter = button.querySelector('.like-count');
+            if (counter) {
+                counter.textContent = count;
+            }
+        });
+    }
+    
+    function hydrateLikes(buttons) {
+        const ids = [...new Set(Array.from(buttons, button => button.dataset.postId))].slice(0, 100);
+        fetch(`/likes/state?ids=${ids.join(',')}`, { credentials: 'same-origin' })
+            .then(response => response.json())
+            .then(data => {
+                Object.entries(data.posts).forEach(([postId, state]) => {
+                    setLikeState(postId, state.liked, state.likes_count);
+                });
+                if (!data.authenticated) {
+                    buttons.forEach(button => {
+                        button.disabled = true;
+                        button.title = 'Login to like';
+                    });
+                }
+            })
+            .catch(error => console.error('Error loading likes:', error));
+    }
+    
+    function toggleLike(event) {
+        event.preventDefault();
+        const button = event.currentTarget;
+        const csrfToken = document.querySelector('meta[name="csrf-token"]');
+        // Ask for the opposite of what is shown, so a double click or a
+        // retried request lands on the same state instead of flipping back
+        const wanted = button.dataset.liked !== 'true';
+        
+        fetch(`/like/${button.dataset.postId}`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-Requested-With': 'XMLHttpRequest',
+                'X-CSRFToken': csrfToken ? csrfToken.content : ''
+            },
+            body: JSON.stringify({ liked: wanted }),
+            credentials: 'same-origin'
+        })
+            .then(response => response.json())
+            .then(data => setLikeState(button.dataset.postId, data.liked, data.likes_count))
+            .catch(error => {
+                console.error('Error:', error);
+                alert('An error occurred while processing your like.');
+            });
+    }
+    
     // Initialize image lightbox for blog post images (only if not already initialized in post.html)
     if (!document.querySelector('.lightbox-initialized')) {
         const blogImages = document.querySelectorAll('.blog-content img:not([data-lightbox-initialized])');
@@ -0,0 +1,154 @@
+import hashlib
+import os
+import re
+import secrets
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from flask import current_app, url_for
+from markupsafe import Markup
+from PIL import Image
+
+# Square bounding boxes generated for every upload: card avatar and profile
+PICTURE_SIZES = (32, 300)
+PICTURE_FORMATS = (('jpg', 'JPEG'), ('webp', 'WEBP'))
+
+# '<12 hex digest>-<size>.<ext>' still fits User.image_file (String(20))
+_VARIANT_RE = re.compile(r'^(?P<digest>[0-9a-f]{12})-(?P<size>\d+)\.(?P<ext>jpg|webp)$')
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=current_app.config.get('PICTURE_WORKERS', 2))
+    return _executor
+
+
+def variant_name(digest, size, ext='jpg'):
+    return f'{digest}-{size}.{ext}'
+
+
+def process_picture(staged_path, output_dir):
+    """
+    Build every size/format variant of a staged upload.
+
+    Runs in a worker process, so it only deals in paths and returns the
+    content-addressed digest the variants were saved under.
+    """
+    try:
+        with open(staged_path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:12]
+
+        with Image.open(staged_path) as source:
+            # Let the JPEG decoder downscale by a power of two while decoding,
+            # so a large photo is never fully decompressed
+            if source.format == 'JPEG':
+                source.draft('RGB', (max(PICTURE_SIZES), max(PICTURE_SIZES)))
+            image = source.convert('RGB')
+
+        os.makedirs(output_dir, exist_ok=True)
+        for size in sorted(PICTURE_SIZES, reverse=True):
+            image.thumbnail((size, size))
+            for ext, fmt in PICTURE_FORMATS:
+                path = os.path.join(output_dir, variant_name(digest, size, ext))
+                if not os.path.exists(path):
+                    image.save(path, fmt, quality=85)
+    finally:
+        # Unreadable or corrupt uploads must not pile up in staging either
+        if os.path.exists(staged_path):
+            os.remove(staged_path)
+    return digest
+
+
+def remove_picture(image_file, output_dir):
+    """Delete every variant of a processed picture, or a legacy upload."""
+    match = _VARIANT_RE.match(image_file or '')
+    if match is None:
+        # Uploads from before variants were generated are a single file
+        if image_file and image_file != 'default.jpg':
+            path = os.path.join(output_dir, os.path.basename(image_file))
+            if os.path.exists(path):
+                os.remove(path)
+        return
+    for size in PICTURE_SIZES:
+        for ext, _ in PICTURE_FORMATS:
+            path = os.path.join(output_dir, variant_name(match['digest'], size, ext))
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _finish(app, user_id, future):
+    from app import db
+    from app.models import User
+    from app.user_cache import user_cache
+
+    with app.app_context():
+        try:
+            digest = future.result()
+        except Exception:
+            app.logger.exception('Profile picture processing failed for user %s', user_id)
+            return
+
+        user = db.session.get(User, user_id)
+        if user is None:
+            return
+        old_image = user.image_file
+        user.image_file = variant_name(digest, max(PICTURE_SIZES))
+        db.session.commit()
+        user_cache.invalidate(user_id)
+
+        # Drop the previous picture unless someone else uploaded the same file
+        output_dir = app.config['PROFILE_PICS_FOLDER']
+        if old_image != user.image_file and \
+                not User.query.filter_by(image_file=old_image).first():
+            remove_picture(old_image, output_dir)
+
+
+def stage_picture(form_picture, user):
+    """
+    Save an uploaded picture to the staging area and queue it for processing.
+
+    The user's ``image_file`` switches over once the variants exist.
+    """
+    app = current_app._get_current_object()
+    staging_dir = app.config['PICTURE_STAGING_FOLDER']
+    os.makedirs(staging_dir, exist_ok=True)
+
+    _, f_ext = os.path.splitext(form_picture.filename)
+    staged_path = os.path.join(staging_dir, secrets.token_hex(8) + f_ext.lower())
+    form_picture.save(staged_path)
+
+    output_dir = app.config['PROFILE_PICS_FOLDER']
+    user_id = user.id
+    if app.config.get('PICTURE_PROCESSING_INLINE'):
+        future = Future()
+        try:
+            future.set_result(process_picture(staged_path, output_dir))
+        except Exception as e:
+            future.set_exception(e)
+    else:
+        future = _get_executor().submit(process_picture, staged_path, output_dir)
+    future.add_done_callback(lambda f: _finish(app, user_id, f))
+
+
+def avatar_url(image_file, size=300, ext='jpg'):
+    """Template global: URL of the closest generated variant of a picture."""
+    match = _VARIANT_RE.match(image_file or '')
+    if match is None:
+        return url_for('static', filename='profile_pics/' + (image_file or 'default.jpg'))
+    size = min(PICTURE_SIZES, key=lambda s: (s < size, abs(s - size)))
+    return url_for('static', filename='profile_pics/' + variant_name(match['digest'], size, ext))
+
+
+def avatar_source(image_file, size=300):
+    """
+    Template global: a WebP ``<source>`` for an avatar's ``<picture>``, or
+    nothing for legacy uploads that only exist in their original format.
+    """
+    match = _VARIANT_RE.match(image_file or '')
+    if match is None:
+        return Markup('')
+    return Markup('<source type="image/webp" srcset="{}">').format(
+        avatar_url(image_file, size, 'webp'))
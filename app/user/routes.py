@@ -1,15 +1,16 @@
-from flask import render_template, url_for, flash, redirect, request, abort, current_app
-from flask_login import login_required, current_user
-from werkzeug.utils import secure_filename
-import os
+from flask import render_template, url_for, flash, redirect, request, abort
+from flask_login import login_required, current_user, logout_user
 from datetime import datetime
-from PIL import Image
-import secrets
 
 from . import user_bp
 from .. import db
 from ..models import User, Post, Comment
-from ..decorators import admin_required, permission_required
+from ..decorators import admin_required, permission_required, current_user_is_admin
+from ..pagination import keyset_paginate, cursor_arg
+from .images import stage_picture, avatar_url, avatar_source
+from ..user_cache import user_cache
+from ..liked_cache import liked_cache
+from ..db_routing import read_only
 from .forms import (
     EditProfileForm, 
     ChangePasswordForm, 
@@ -18,37 +19,11 @@ from .forms import (
     PrivacySettingsForm
 )
 
-# Helper function to save profile picture
-def save_picture(form_picture):
-    random_hex = secrets.token_hex(8)
-    _, f_ext = os.path.splitext(form_picture.filename)
-    picture_fn = random_hex + f_ext
-    picture_path = os.path.join(current_app.root_path, 'static/profile_pics', picture_fn)
-    
-    # Create directory if it doesn't exist
-    os.makedirs(os.path.dirname(picture_path), exist_ok=True)
-    
-    # Resize image
-    output_size = (300, 300)
-    i = Image.open(form_picture)
-    i.thumbnail(output_size)
-    
-    # Save the image
-    i.save(picture_path)
-    
-    # Delete old profile picture if it's not the default
-    if current_user.image_file != 'default.jpg':
-        old_picture_path = os.path.join(
-            current_app.root_path, 
-            'static/profile_pics', 
-            current_user.image_file
-        )
-        if os.path.exists(old_picture_path):
-            os.remove(old_picture_path)
-    
-    return picture_fn
+user_bp.add_app_template_global(avatar_url)
+user_bp.add_app_template_global(avatar_source)
 
 @user_bp.route('/user/<username>')
+@read_only
 def profile(username):
     user = User.query.filter_by(username=username).first_or_404()
     page = request.args.get('page', 1, type=int)
@@ -68,7 +43,7 @@ def profile(username):
 @user_bp.route('/user/<username>/edit', methods=['GET', 'POST'])
 @login_required
 def edit_profile(username):
-    if current_user.username != username and not current_user.is_admin:
+    if current_user.username != username and not current_user_is_admin():
         abort(403)
     
     user = User.query.filter_by(username=username).first_or_404()
@@ -77,8 +52,9 @@ def edit_profile(username):
     
     if form.validate_on_submit():
         if form.picture.data:
-            picture_file = save_picture(form.picture.data)
-            user.image_file = picture_file
+            # Resizing happens off the request; image_file switches when done
+            stage_picture(form.picture.data, user)
+            flash('Your new profile picture is being processed.', 'info')
         
         user.username = form.username.data
         user.email = form.email.data
@@ -87,6 +63,7 @@ def edit_profile(username):
         user.website = form.website.data
         
         db.session.commit()
+        user_cache.invalidate(user.id)
         flash('Your profile has been updated!', 'success')
         return redirect(url_for('user.profile', username=user.username))
     elif request.method == 'GET':
@@ -105,7 +82,7 @@ def edit_profile(username):
 @user_bp.route('/user/<username>/change_password', methods=['POST'])
 @login_required
 def change_password(username):
-    if current_user.username != username and not current_user.is_admin:
+    if current_user.username != username and not current_user_is_admin():
         abort(403)
     
     user = User.query.filter_by(username=username).first_or_404()
@@ -115,6 +92,7 @@ def change_password(username):
         if user.check_password(form.current_password.data):
             user.set_password(form.new_password.data)
             db.session.commit()
+            user_cache.invalidate(user.id)
             flash('Your password has been updated!', 'success')
         else:
             flash('Current password is incorrect.', 'danger')
@@ -128,7 +106,7 @@ def change_password(username):
 @user_bp.route('/user/<username>/delete', methods=['POST'])
 @login_required
 def delete_account(username):
-    if current_user.username != username and not current_user.is_admin:
+    if current_user.username != username and not current_user_is_admin():
         abort(403)
     
     user = User.query.filter_by(username=username).first_or_404()
@@ -139,6 +117,8 @@ def delete_account(username):
     # Delete user's posts, comments, etc.
     # (Handled by CASCADE in the database, but we can add additional cleanup here if needed)
     
+    user_cache.invalidate(user.id)
+    liked_cache.invalidate(user.id)
     db.session.delete(user)
     db.session.commit()
     
@@ -146,12 +126,17 @@ def delete_account(username):
     return redirect(url_for('main.home'))
 
 @user_bp.route('/user/<username>/posts')
+@read_only
 def user_posts(username):
     user = User.query.filter_by(username=username).first_or_404()
-    page = request.args.get('page', 1, type=int)
-    posts = Post.query.filter_by(author=user, is_published=True)\
-                     .order_by(Post.date_posted.desc())\
+    page = request.args.get('page', type=int)
+    query = Post.query.filter_by(author=user, is_published=True)
+    if page is not None:
+        posts = query.order_by(Post.date_posted.desc())\
                      .paginate(page=page, per_page=10, error_out=False)
+    else:
+        posts = keyset_paginate(query, Post.date_posted, Post.id,
+                                cursor=cursor_arg(), per_page=10)
     
     return render_template('user/user_posts.html', 
                          user=user, 
@@ -159,12 +144,17 @@ def user_posts(username):
                          title=f"{user.username}'s Posts")
 
 @user_bp.route('/user/<username>/comments')
+@read_only
 def user_comments(username):
     user = User.query.filter_by(username=username).first_or_404()
-    page = request.args.get('page', 1, type=int)
-    comments = Comment.query.filter_by(author=user, is_approved=True)\
-                          .order_by(Comment.date_posted.desc())\
-                          .paginate(page=page, per_page=10, error_out=False)
+    page = request.args.get('page', type=int)
+    query = Comment.query.filter_by(author=user, is_approved=True)
+    if page is not None:
+        comments = query.order_by(Comment.date_posted.desc())\
+                        .paginate(page=page, per_page=10, error_out=False)
+    else:
+        comments = keyset_paginate(query, Comment.date_posted, Comment.id,
+                                   cursor=cursor_arg(), per_page=10)
     
     return render_template('user/user_comments.html', 
                          user=user, 
@@ -184,6 +174,7 @@ def notification_settings():
         current_user.newsletter = form.newsletter.data
         
         db.session.commit()
+        user_cache.invalidate(current_user.id)
         flash('Your notification settings have been updated!', 'success')
         return redirect(url_for('user.notification_settings'))
     elif request.method == 'GET':
@@ -208,6 +199,7 @@ def privacy_settings():
         current_user.allow_search_engines = form.allow_search_engines.data
         
         db.session.commit()
+        user_cache.invalidate(current_user.id)
         flash('Your privacy settings have been updated!', 'success')
         return redirect(url_for('user.privacy_settings'))
     elif request.method == 'GET':
@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+# Credentials are never kept in process memory; on a hit they stay unloaded
+# and are read from the database if something touches them
+UNCACHED_COLUMNS = ('password_hash', 'reset_token', 'reset_token_expiry')
+# Cached for rendering (the admin menu) but re-read by every check that
+# grants access, see :meth:`UserCache.refresh_access`
+ACCESS_COLUMNS = ('is_admin', 'is_active')
+
+
+class UserCache:
+    """
+    Short-lived, per-process cache of the columns Flask-Login loads for the
+    signed-in user, so authenticated requests skip the primary-key lookup.
+
+    Hits are re-attached to the request's session with ``merge(load=False)``,
+    which issues no SQL and keeps identity comparisons such as
+    ``post.author == current_user`` working. Writes to a user call
+    :meth:`invalidate`; other workers see the change within the TTL, which
+    is why password and permission checks never trust a cached copy.
+    """
+
+    def __init__(self, ttl=30, maxsize=10000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.load_seconds = 0.0
+
+    def init_app(self, app):
+        self.ttl = app.config.setdefault('USER_CACHE_TTL', self.ttl)
+        self.maxsize = app.config.setdefault('USER_CACHE_SIZE', self.maxsize)
+
+        from app.metrics import register_collector
+        register_collector('user_cache', self.stats)
+
+    def get(self, user_id):
+        from app import db
+        from app.models import User
+
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                values = entry[1]
+            else:
+                values = None
+        if values is not None:
+            user = User(**values)
+            make_transient_to_detached(user)
+            return db.session.merge(user, load=False)
+
+        started = time.perf_counter()
+        user = db.session.get(User, user_id)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.misses += 1
+            self.load_seconds += elapsed
+            if user is not None and self.ttl > 0:
+                values = {attr.key: getattr(user, attr.key)
+                          for attr in User.__mapper__.column_attrs
+                          if attr.key not in UNCACHED_COLUMNS}
+                self._entries[user_id] = (time.monotonic() + self.ttl, values)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return user
+
+    @staticmethod
+    def refresh_access(user, *columns):
+        """
+        Re-read ``is_admin``/``is_active`` (and any other ``columns``) of a
+        possibly cached user in one query.
+        """
+        from app import db
+
+        if inspect(user).persistent:
+            db.session.refresh(user, ACCESS_COLUMNS + columns)
+        return user
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def stats(self):
+        with self._lock:
+            avg_load = self.load_seconds / self.misses if self.misses else 0.0
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'load_seconds_total': round(self.load_seconds, 6),
+                # What the hits would have cost at the observed miss latency
+                'saved_seconds_estimate': round(self.hits * avg_load, 6),
+            }
+
+
+user_cache = UserCache()
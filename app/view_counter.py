@@ -0,0 +1,70 @@
+from collections import Counter
+
+from sqlalchemy import case, func, update
+
+from app.write_buffer import WriteBuffer
+
+
+class ViewCounter(WriteBuffer):
+    """
+    Per-process buffer of post view increments.
+
+    Views are added up in memory and written in one batched UPDATE once the
+    buffer holds ``VIEW_COUNT_FLUSH_SIZE`` views, every
+    ``VIEW_COUNT_FLUSH_INTERVAL`` seconds, and when the worker exits, so
+    viewing a post never writes to the database inside the request.
+    """
+
+    config_prefix = 'VIEW_COUNT'
+
+    def __init__(self):
+        super().__init__()
+        self.flush_size = 500
+        self._pending = Counter()
+        self.flushed = 0
+
+    def init_app(self, app):
+        super().init_app(app)
+        self.flush_size = app.config.setdefault('VIEW_COUNT_FLUSH_SIZE', self.flush_size)
+
+        from app.metrics import register_collector
+        register_collector('view_counter', self.stats)
+
+    def record(self, post_id):
+        with self._lock:
+            self._ensure_worker()
+            self._pending[post_id] += 1
+            full = sum(self._pending.values()) >= self.flush_size
+        if full:
+            self.wake()
+
+    def _take(self):
+        pending, self._pending = self._pending, Counter()
+        return pending
+
+    def _restore(self, batch):
+        self._pending.update(batch)
+
+    def _write(self, connection, batch):
+        from app.models import Post
+
+        post = Post.__table__
+        increment = case(batch, value=post.c.id, else_=0)
+        connection.execute(
+            update(post)
+            .where(post.c.id.in_(list(batch)))
+            .values(view_count=func.coalesce(post.c.view_count, 0) + increment,
+                    # a view is not an edit
+                    last_updated=post.c.last_updated)
+        )
+
+    def _written(self, batch):
+        self.flushed += sum(batch.values())
+
+    def stats(self):
+        with self._lock:
+            pending = sum(self._pending.values())
+        return {'pending': pending, 'flushed': self.flushed, 'flush_errors': self.flush_errors}
+
+
+view_counter = ViewCounter()
@@ -0,0 +1,80 @@
+import atexit
+
+from app.background import BackgroundWorker
+
+
+class WriteBuffer(BackgroundWorker):
+    """
+    Base for per-process buffers that batch small writes into one statement.
+
+    Subclasses keep their pending state in ``self._pending`` and implement
+    :meth:`_take`, :meth:`_write` and :meth:`_restore`. A daemon thread
+    flushes every ``<prefix>_FLUSH_INTERVAL`` seconds, :meth:`wake` forces an
+    early flush, and everything left over is written when the process exits.
+    """
+
+    config_prefix = None
+    flush_interval = 30
+
+    def __init__(self):
+        super().__init__()
+        self.flush_errors = 0
+
+    def init_app(self, app):
+        self.app = app
+        self.flush_interval = app.config.setdefault(
+            f'{self.config_prefix}_FLUSH_INTERVAL', self.flush_interval)
+        atexit.register(self.flush_at_exit)
+
+    @property
+    def worker_name(self):
+        return self.config_prefix.lower()
+
+    @property
+    def interval(self):
+        return self.flush_interval
+
+    def _forked(self):
+        # Whatever the master buffered before forking is the master's to write
+        self._pending.clear()
+
+    def _work(self):
+        self.flush()
+
+    def _take(self):
+        """Remove and return the batch to write (called with the lock held)."""
+        raise NotImplementedError
+
+    def _write(self, connection, batch):
+        raise NotImplementedError
+
+    def _restore(self, batch):
+        """Put a failed batch back (called with the lock held)."""
+        raise NotImplementedError
+
+    def flush(self):
+        with self._lock:
+            batch = self._take()
+        if not batch or self.app is None:
+            return
+
+        from app import db
+
+        try:
+            with self.app.app_context(), db.engine.begin() as connection:
+                self._write(connection, batch)
+        except Exception:
+            # Keep the data so the next flush retries it
+            with self._lock:
+                self._restore(batch)
+                self.flush_errors += 1
+            self.app.logger.exception('Failed to flush %s', type(self).__name__)
+            return
+        self._written(batch)
+
+    def _written(self, batch):
+        """Hook run after a batch has been committed."""
+
+    def flush_at_exit(self):
+        """Write everything still buffered; run when the process shuts down."""
+        self.flush()
@@ -0,0 +1,117 @@
+"""
+Concurrency check for the like endpoint.
+
+Many threads hit ``posts.like_post`` on one post at the same time: first
+several threads per user all asking to like (must end with exactly one like
+per user), then everyone toggling at random. Afterwards the stored
+``post.like_count`` must equal the rows in ``likes`` and no request may have
+failed. Runs against a throwaway SQLite file unless ``--database`` is given::
+
+    python benchmarks/like_hammer.py --users 20 --threads-per-user 4
+
+The project has no test suite, so this lives with the other scripts under
+``benchmarks/`` instead of as a pytest module. It exits non-zero when any
+check fails, so CI or a pre-deploy step can run it as a test.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def hammer(app, post_id, user_ids, threads_per_user, rounds, body_for):
+    statuses = Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(len(user_ids) * threads_per_user)
+
+    def worker(user_id, seed):
+        rng = random.Random(seed)
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+        seen = Counter()
+        barrier.wait()
+        for _ in range(rounds):
+            response = client.post(f'/like/{post_id}', json=body_for(rng),
+                                   headers={'X-Requested-With': 'XMLHttpRequest'})
+            seen[response.status_code] += 1
+        with lock:
+            statuses.update(seen)
+
+    threads = [threading.Thread(target=worker, args=(uid, uid * 100 + n))
+               for uid in user_ids for n in range(threads_per_user)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--database', help='DATABASE_URL to use instead of a temp SQLite file')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--threads-per-user', type=int, default=4)
+    parser.add_argument('--rounds', type=int, default=25, help='requests per thread and phase')
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ['DATABASE_URL'] = args.database or 'sqlite:///' + os.path.join(tmp.name, 'hammer.db')
+    os.environ['AUTO_CREATE_SCHEMA'] = 'true'
+
+    from app import create_app, db
+    from app.models import Like, Post, User
+
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        users = [User(username=f'hammer{n}', email=f'hammer{n}@example.com')
+                 for n in range(args.users)]
+        db.session.add_all(users)
+        db.session.flush()
+        post = Post(title='Hammered', slug=f'hammered-{random.getrandbits(32)}',
+                    content='<p>Like me</p>', author=users[0])
+        db.session.add(post)
+        db.session.commit()
+        post_id, user_ids = post.id, [user.id for user in users]
+
+    def stored_state():
+        with app.app_context():
+            likes = Like.query.filter_by(post_id=post_id).count()
+            count = db.session.get(Post, post_id).like_count
+            db.session.remove()
+        return likes, count
+
+    failed = False
+    phases = (
+        ('duplicate likes', lambda rng: {'liked': True}),
+        ('random toggles', lambda rng: rng.choice([{}, {'liked': True}, {'liked': False}])),
+    )
+    for name, body_for in phases:
+        statuses = hammer(app, post_id, user_ids, args.threads_per_user, args.rounds, body_for)
+        likes, count = stored_state()
+        errors = sum(n for status, n in statuses.items() if status >= 400)
+        print(f'{name:<16} responses {dict(statuses)}  likes {likes}  like_count {count}')
+        if errors or likes != count:
+            failed = True
+        if name == 'duplicate likes' and likes != len(user_ids):
+            print(f'  expected exactly {len(user_ids)} likes')
+            failed = True
+
+    with app.app_context():
+        Like.query.filter_by(post_id=post_id).delete()
+        Post.query.filter_by(id=post_id).delete()
+        User.query.filter(User.id.in_(user_ids)).delete(synchronize_session=False)
+        db.session.commit()
+    print('FAIL' if failed else 'ok')
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Login throughput at different bcrypt cost factors.
+
+Verifies a password the way ``auth.login`` does, through the bounded
+password service, from a number of concurrent client threads, and
+reports logins per second and latency percentiles for each cost::
+
+    python benchmarks/password_hashing.py --rounds 10 11 12 13 --clients 8
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.passwords import PasswordService, PasswordServiceBusy  # noqa: E402
+
+PASSWORD = 'correct horse battery staple'
+
+
+def run(rounds, clients, logins, workers, queue):
+    service = PasswordService(rounds=rounds, workers=workers, queue=queue, wait=30)
+    hashed = service.hash(PASSWORD)
+    latencies = []
+    rejected = 0
+
+    def login(_):
+        started = time.perf_counter()
+        try:
+            assert service.verify(hashed, PASSWORD)
+        except PasswordServiceBusy:
+            return None
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        for latency in pool.map(login, range(logins)):
+            if latency is None:
+                rejected += 1
+            else:
+                latencies.append(latency)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    return {
+        'rounds': rounds,
+        'logins_per_sec': len(latencies) / elapsed,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'rejected': rejected,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rounds', type=int, nargs='+', default=[10, 11, 12, 13])
+    parser.add_argument('--clients', type=int, default=8,
+                        help='concurrent login attempts')
+    parser.add_argument('--logins', type=int, default=64,
+                        help='logins per cost setting')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2,
+                        help='hashing threads (PASSWORD_HASH_WORKERS)')
+    parser.add_argument('--queue', type=int, default=8,
+                        help='waiting slots (PASSWORD_HASH_QUEUE)')
+    args = parser.parse_args()
+
+    print(f"{'rounds':>6} {'logins/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'rejected':>8}")
+    for rounds in args.rounds:
+        r = run(rounds, args.clients, args.logins, args.workers, args.queue)
+        print(f"{r['rounds']:>6} {r['logins_per_sec']:>10.1f} {r['p50_ms']:>8.1f} "
+              f"{r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['rejected']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""
+Latency and throughput of the main routes against a seeded database.
+
+Requests go through the Flask test client (no network), optionally from
+several threads. Percentiles and throughput are written as JSON and
+checked against ``benchmarks/thresholds.json``: an absolute p95 ceiling per
+scenario and, with ``--baseline``, a maximum p95 regression against an
+earlier run. The exit status is non-zero when a threshold is broken::
+
+    DATABASE_URL=sqlite:////tmp/bench.db flask seed
+    python benchmarks/run.py --database sqlite:////tmp/bench.db \\
+        --output results.json --baseline last-release.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SCENARIOS = ('home', 'blog', 'category', 'post', 'profile', 'post_likes', 'like_toggle')
+
+
+def _percentile(sorted_values, p):
+    index = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def _targets(app, rng, samples):
+    """Pick the posts, users and categories requests will be spread over."""
+    from flask import url_for
+    from sqlalchemy import func
+    from app import db
+    from app.models import Post, User
+
+    with app.app_context():
+        post_ids = [pid for (pid,) in db.session.query(Post.id)
+                    .filter(Post.is_published.is_(True))
+                    .order_by(func.random()).limit(samples)]
+        usernames = [name for (name,) in db.session.query(User.username)
+                     .order_by(func.random()).limit(samples)]
+        categories = [c for (c,) in db.session.query(Post.category).distinct()]
+        user_id = db.session.query(User.id).order_by(User.id).limit(1).scalar()
+    if not post_ids or not usernames:
+        raise SystemExit('The database is empty; run `flask seed` first.')
+
+    with app.test_request_context():
+        urls = {
+            'home': lambda: ('GET', url_for('main.home')),
+            'blog': lambda: ('GET', url_for('main.blog')),
+            'category': lambda: ('GET', url_for('main.category', category_name=rng.choice(categories))),
+            'post': lambda: ('GET', url_for('main.post', post_id=rng.choice(post_ids))),
+            'profile': lambda: ('GET', url_for('user.profile', username=rng.choice(usernames))),
+            'post_likes': lambda: ('GET', url_for('posts.post_likes', post_id=rng.choice(post_ids))),
+            'like_toggle': lambda: ('POST', url_for('posts.like_post', post_id=rng.choice(post_ids[:10]))),
+        }
+        # url_for needs a request context, so resolve URLs up front
+        return {name: [make() for _ in range(512)] for name, make in urls.items()}, user_id
+
+
+def _run_scenario(app, requests, user_id, count, concurrency):
+    latencies, errors = [], 0
+    lock = threading.Lock()
+    per_thread = max(1, count // concurrency)
+
+    def worker(offset):
+        nonlocal errors
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+        mine, failed = [], 0
+        for i in range(per_thread):
+            method, url = requests[(offset + i) % len(requests)]
+            started = time.perf_counter()
+            response = client.open(url, method=method,
+                                   headers={'X-Requested-With': 'XMLHttpRequest'})
+            mine.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                failed += 1
+        with lock:
+            latencies.extend(mine)
+            errors += failed
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(n * per_thread,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2),
+        'p50_ms': round(_percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(_percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(_percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def check(results, thresholds, baseline=None):
+    """Return a list of threshold violations."""
+    problems = []
+    max_regression = thresholds.get('max_regression_pct')
+    for name, result in results['scenarios'].items():
+        if result['errors']:
+            problems.append(f"{name}: {result['errors']} error response(s)")
+        ceiling = thresholds.get('scenarios', {}).get(name, {}).get('p95_ms')
+        if ceiling is not None and result['p95_ms'] > ceiling:
+            problems.append(f"{name}: p95 {result['p95_ms']} ms exceeds {ceiling} ms")
+        previous = (baseline or {}).get('scenarios', {}).get(name)
+        if previous and max_regression is not None:
+            limit = previous['p95_ms'] * (1 + max_regression / 100)
+            if result['p95_ms'] > limit:
+                problems.append(f"{name}: p95 {result['p95_ms']} ms is more than "
+                                f"{max_regression}% above baseline {previous['p95_ms']} ms")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--database', help='DATABASE_URL of a seeded database')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--requests', type=int, default=500, help='requests per scenario')
+    parser.add_argument('--warmup', type=int, default=50, help='unmeasured requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=1, help='client threads')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--thresholds', default=os.path.join(ROOT, 'benchmarks', 'thresholds.json'))
+    parser.add_argument('--baseline', help='earlier results to compare against')
+    args = parser.parse_args()
+
+    if args.database:
+        os.environ['DATABASE_URL'] = args.database
+    # Measure the app, not the one-off schema check
+    os.environ.setdefault('AUTO_CREATE_SCHEMA', 'false')
+
+    from app import create_app
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+
+    rng = random.Random(args.seed)
+    targets, user_id = _targets(app, rng, samples=200)
+
+    results = {
+        'meta': {
+            'started': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'database': app.config['SQLALCHEMY_DATABASE_URI'].split('://')[0],
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+        },
+        'scenarios': {},
+    }
+    for name in args.scenarios:
+        _run_scenario(app, targets[name], user_id, args.warmup, 1)
+        result = _run_scenario(app, targets[name], user_id, args.requests, args.concurrency)
+        results['scenarios'][name] = result
+        print(f"{name:<12} p50 {result['p50_ms']:>8.2f}  p95 {result['p95_ms']:>8.2f}  "
+              f"p99 {result['p99_ms']:>8.2f} ms  {result['throughput_rps']:>8.1f} req/s"
+              f"  errors {result['errors']}")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    with open(args.thresholds) as f:
+        thresholds = json.load(f)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    problems = check(results, thresholds, baseline)
+    for problem in problems:
+        print(f'FAIL {problem}')
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()
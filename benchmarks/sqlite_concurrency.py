@@ -0,0 +1,106 @@
+"""
+Concurrent read/write throughput on SQLite, default settings vs. the pragmas
+``app.database`` applies (WAL, synchronous=NORMAL, mmap, busy timeout).
+
+Reader threads fetch a page of the newest posts while writer threads bump
+view counts, through a pooled SQLAlchemy engine like the app's::
+
+    python benchmarks/sqlite_concurrency.py --readers 8 --writers 2 --seconds 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import install_sqlite_pragmas  # noqa: E402
+
+PRAGMAS = {'journal_mode': 'WAL', 'synchronous': 'NORMAL',
+           'mmap_size': 256 * 1024 * 1024, 'busy_timeout': 5000}
+
+ROWS = 5000
+
+
+def _setup(engine):
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE post (id INTEGER PRIMARY KEY, title TEXT, '
+                          'date_posted TEXT, view_count INTEGER NOT NULL DEFAULT 0)'))
+        conn.execute(text('CREATE INDEX ix_post_date_posted ON post (date_posted)'))
+        conn.execute(text('INSERT INTO post (title, date_posted) VALUES (:title, :date)'),
+                     [{'title': f'Post {i}', 'date': f'2024-01-01 00:00:{i:06d}'}
+                      for i in range(ROWS)])
+
+
+def run(path, readers, writers, seconds, tuned):
+    engine = create_engine(f'sqlite:///{path}', pool_size=readers + writers, max_overflow=0)
+    if tuned:
+        install_sqlite_pragmas(engine, PRAGMAS)
+    _setup(engine)
+
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def reader():
+        done = errors = 0
+        while time.perf_counter() < deadline:
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text('SELECT id, title FROM post '
+                                      'ORDER BY date_posted DESC LIMIT 20')).all()
+                done += 1
+            except OperationalError:
+                errors += 1
+        with lock:
+            counts['reads'] += done
+            counts['errors'] += errors
+
+    def writer(seed):
+        done = errors = 0
+        while time.perf_counter() < deadline:
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text('UPDATE post SET view_count = view_count + 1 WHERE id = :id'),
+                                 {'id': (seed + done) % ROWS + 1})
+                done += 1
+            except OperationalError:
+                # "database is locked"
+                errors += 1
+        with lock:
+            counts['writes'] += done
+            counts['errors'] += errors
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer, args=(i * 997,)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+    return {key: value / seconds if key != 'errors' else value for key, value in counts.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    print(f"{'settings':<10} {'reads/s':>10} {'writes/s':>10} {'errors':>8}")
+    for tuned in (False, True):
+        with tempfile.TemporaryDirectory() as tmp:
+            result = run(os.path.join(tmp, 'bench.db'), args.readers, args.writers,
+                         args.seconds, tuned)
+        print(f"{'pragmas' if tuned else 'default':<10} {result['reads']:>10.0f} "
+              f"{result['writes']:>10.0f} {result['errors']:>8}")
+
+
+if __name__ == '__main__':
+    main()
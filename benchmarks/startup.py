@@ -0,0 +1,65 @@
+"""
+Import and app-factory time, measured in fresh interpreters.
+
+Each run starts a new Python process, imports the ``app`` package and calls
+``create_app()`` the way a gunicorn worker boots, then reports the median of
+every boot phase. ``--json`` writes the result so it can be compared across
+releases::
+
+    python benchmarks/startup.py --runs 15 --json startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+timings = {'import_seconds': imported - started, 'create_app_seconds': created - imported}
+timings.update(application.extensions['boot_timings'].stats())
+print(json.dumps(timings))
+"""
+
+
+def measure(runs, production):
+    env = dict(os.environ)
+    with tempfile.TemporaryDirectory() as tmp:
+        env.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tmp, 'startup.db'))
+        if production:
+            env['FLASK_ENV'] = 'production'
+        samples = []
+        for _ in range(runs):
+            out = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, env=env,
+                                 check=True, capture_output=True, text=True).stdout
+            samples.append(json.loads(out.strip().splitlines()[-1]))
+    return {key: statistics.median(sample[key] for sample in samples) for key in samples[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--dev', action='store_true',
+                        help='boot in development mode (creates tables at startup)')
+    parser.add_argument('--json', metavar='PATH', help='write the medians to PATH')
+    args = parser.parse_args()
+
+    result = measure(args.runs, production=not args.dev)
+    for key, seconds in result.items():
+        print(f'{key:<28} {seconds * 1000:>9.1f} ms')
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,26 +1,73 @@
 import os
-from dotenv import load_dotenv
 
-# Load environment variables from .env file
 basedir = os.path.abspath(os.path.dirname(__file__))
-load_dotenv(os.path.join(basedir, '.env'))
+
+# Production gets its environment from the platform; elsewhere read the
+# project's .env directly instead of letting find_dotenv() search for one
+if os.environ.get('FLASK_ENV') != 'production' and \
+        os.path.exists(os.path.join(basedir, '.env')):
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(basedir, '.env'))
+
+
+def _env_flag(name, default):
+    return os.environ.get(name, default).lower() in ['true', 'on', '1']
+
+
+def _database_url(name, default=None):
+    uri = os.environ.get(name, default)
+    # Handle Heroku's postgres URL format
+    if uri and uri.startswith('postgres://'):
+        uri = uri.replace('postgres://', 'postgresql://', 1)
+    return uri
+
 
 class Config:
     # Secret key for CSRF protection and session management
-    SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-key-please-change-in-production'
+    SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-key-123'
     
-    # Database configuration
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
-        'sqlite:///' + os.path.join(basedir, 'app.db')
+    # Database configuration; the SQLite default lives in the instance folder
+    SQLALCHEMY_DATABASE_URI = _database_url('DATABASE_URL', 'sqlite:///blog.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Connection pool and per-connection settings, turned into
+    # SQLALCHEMY_ENGINE_OPTIONS by app.database.engine_options
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '5'))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', '10'))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', '10'))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', '1800'))
+    DB_POOL_PRE_PING = _env_flag('DB_POOL_PRE_PING', 'true')
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', '5000'))
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+    
+    # Optional read replica for the read-only views (see app.db_routing)
+    REPLICA_DATABASE_URL = _database_url('REPLICA_DATABASE_URL')
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', '10'))
+    
+    # Development creates missing tables at startup; production never does
+    AUTO_CREATE_SCHEMA = _env_flag(
+        'AUTO_CREATE_SCHEMA', 'false' if os.environ.get('FLASK_ENV') == 'production' else 'true')
+    
+    # Per-request SQL/template accounting (see app.instrumentation)
+    PROFILE_REQUESTS = _env_flag('PROFILE_REQUESTS', 'false')
+    N_PLUS_ONE_THRESHOLD = int(os.environ.get('N_PLUS_ONE_THRESHOLD', '10'))
+    # Bearer token for scraping /metrics; admins can always read it
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    
     # Email configuration
     MAIL_SERVER = os.environ.get('MAIL_SERVER', 'smtp.googlemail.com')
     MAIL_PORT = int(os.environ.get('MAIL_PORT', '587'))
-    MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS', 'true').lower() in ['true', 'on', '1']
+    MAIL_USE_TLS = _env_flag('MAIL_USE_TLS', 'true')
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER')
+    # Where contact form notifications go; unset disables them
+    CONTACT_NOTIFY_EMAIL = os.environ.get('CONTACT_NOTIFY_EMAIL')
+    MAIL_OUTBOX_BATCH_SIZE = int(os.environ.get('MAIL_OUTBOX_BATCH_SIZE', '50'))
+    MAIL_OUTBOX_INTERVAL = int(os.environ.get('MAIL_OUTBOX_INTERVAL', '15'))
     
     # Admin configuration
     FLASK_ADMIN_SWATCH = 'flatly'
@@ -29,17 +76,16 @@ class Config:
     POSTS_PER_PAGE = 10
     
     # File uploads
-    UPLOAD_FOLDER = os.path.join(basedir, 'app', 'static', 'uploads')
+    UPLOAD_FOLDER = os.path.join(basedir, 'app', 'static', 'profile_pics')
     PROFILE_PICS_FOLDER = os.path.join(basedir, 'app', 'static', 'profile_pics')
+    PICTURE_STAGING_FOLDER = os.path.join(basedir, 'instance', 'picture_staging')
+    PICTURE_WORKERS = int(os.environ.get('PICTURE_WORKERS', '2'))
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
-    
-    # CKEditor configuration
-    CKEDITOR_SERVE_LOCAL = True
-    CKEDITOR_HEIGHT = 400
-    CKEDITOR_FILE_UPLOADER = 'main.upload'
+    MAX_CONTENT_LENGTH = 5 * 1024 * 1024  # 5MB max file size
     
     # Security
+    PASSWORD_BCRYPT_ROUNDS = int(os.environ.get('PASSWORD_BCRYPT_ROUNDS', '12'))
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', '2'))
     SECURITY_PASSWORD_SALT = os.environ.get('SECURITY_PASSWORD_SALT') or 'dev-salt-please-change-in-production'
     
     # Recaptcha
@@ -49,25 +95,32 @@ class Config:
     @staticmethod
     def init_app(app):
         # Ensure upload directories exist
-        os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
-        os.makedirs(Config.PROFILE_PICS_FOLDER, exist_ok=True)
+        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+        os.makedirs(app.config['PROFILE_PICS_FOLDER'], exist_ok=True)
 
 
 class DevelopmentConfig(Config):
     DEBUG = True
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DEV_DATABASE_URL') or \
+    SQLALCHEMY_DATABASE_URI = _database_url('DEV_DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'app-dev.db')
 
 
 class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    REPLICA_DATABASE_URL = None
+    AUTO_CREATE_SCHEMA = True
+    PICTURE_PROCESSING_INLINE = True
+    SEARCH_BACKEND = 'memory'
+    # Deliver explicitly with mail_outbox.deliver() instead of a thread
+    MAIL_OUTBOX_WORKER = False
+    # Cheapest bcrypt cost, so tests that log in stay fast
+    PASSWORD_BCRYPT_ROUNDS = 4
     WTF_CSRF_ENABLED = False
 
 
 class ProductionConfig(Config):
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
-        'sqlite:///' + os.path.join(basedir, 'app.db')
+    AUTO_CREATE_SCHEMA = _env_flag('AUTO_CREATE_SCHEMA', 'false')
     
     @classmethod
     def init_app(cls, app):
@@ -86,13 +139,6 @@ class HerokuConfig(ProductionConfig):
     def init_app(cls, app):
         ProductionConfig.init_app(app)
         
-        # Log to stderr
-        import logging
-        from logging import StreamHandler
-        file_handler = StreamHandler()
-        file_handler.setLevel(logging.INFO)
-        app.logger.addHandler(file_handler)
-        
         # Handle proxy server headers
         from werkzeug.middleware.proxy_fix import ProxyFix
         app.wsgi_app = ProxyFix(app.wsgi_app)
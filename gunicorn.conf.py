@@ -0,0 +1,28 @@
+# Gunicorn loads ./gunicorn.conf.py automatically, so the Procfile needs no
+# extra flags for these hooks.
+import os
+
+# Sync workers by default. GUNICORN_THREADS above 1 switches to gthread
+# workers, which lets other requests run while one waits on bcrypt (see
+# app/passwords.py), at the cost of running every view concurrently
+threads = int(os.environ.get('GUNICORN_THREADS', '1'))
+
+# Build the app once in the master and fork it, instead of every worker
+# importing and configuring everything itself
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() in ['true', 'on', '1']
+
+
+def post_fork(server, worker):
+    # With preload the master may have opened database connections while
+    # building the app; a forked worker must never reuse those sockets
+    if server.cfg.preload_app:
+        from app.startup import dispose_engines
+        dispose_engines(server.app.wsgi())
+
+
+def worker_exit(server, worker):
+    # Recycled workers (max_requests) must not drop buffered writes
+    from app.presence import last_seen
+    from app.view_counter import view_counter
+    view_counter.flush_at_exit()
+    last_seen.flush_at_exit()
@@ -0,0 +1,41 @@
+"""add category_stats table
+
+Revision ID: 4a8c1e6d2f95
+Revises: 9d3b6f2a1c47
+Create Date: 2026-10-18 21:14:06.730512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4a8c1e6d2f95'
+down_revision = '9d3b6f2a1c47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('category_stats',
+    sa.Column('category', sa.String(length=50), nullable=False),
+    sa.Column('post_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('latest_post_id', sa.Integer(), nullable=True),
+    sa.Column('latest_date', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('category')
+    )
+
+    # Seed the stats from the existing posts; ties on the newest date go to
+    # the highest id
+    op.execute(
+        'INSERT INTO category_stats (category, post_count, latest_post_id, latest_date) '
+        'SELECT p.category, COUNT(*), '
+        '(SELECT MAX(l.id) FROM post l WHERE l.category = p.category '
+        'AND l.date_posted = MAX(p.date_posted)), '
+        'MAX(p.date_posted) '
+        'FROM post p GROUP BY p.category'
+    )
+
+
+def downgrade():
+    op.drop_table('category_stats')
@@ -0,0 +1,32 @@
+"""add denormalized post.like_count
+
+Revision ID: 7b4e91d0a6c2
+Revises: 3f1a2c9d8e01
+Create Date: 2026-10-18 10:03:27.552910
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b4e91d0a6c2'
+down_revision = '3f1a2c9d8e01'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('like_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Seed the counter from the existing likes
+    op.execute(
+        'UPDATE post SET like_count = '
+        '(SELECT COUNT(*) FROM likes WHERE likes.post_id = post.id)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.drop_column('like_count')
@@ -0,0 +1,32 @@
+"""make likes.timestamp not null
+
+Revision ID: b7e3d5a90c28
+Revises: 4a8c1e6d2f95
+Create Date: 2026-10-19 09:41:52.106384
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e3d5a90c28'
+down_revision = '4a8c1e6d2f95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # A like cannot predate its post, so undated likes sort as the oldest
+    op.execute(
+        'UPDATE likes SET timestamp = '
+        '(SELECT post.date_posted FROM post WHERE post.id = likes.post_id) '
+        'WHERE timestamp IS NULL'
+    )
+    with op.batch_alter_table('likes', schema=None) as batch_op:
+        batch_op.alter_column('timestamp', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('likes', schema=None) as batch_op:
+        batch_op.alter_column('timestamp', existing_type=sa.DateTime(), nullable=True)
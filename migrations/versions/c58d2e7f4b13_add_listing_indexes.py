@@ -0,0 +1,44 @@
+"""add composite indexes for listing queries
+
+Revision ID: c58d2e7f4b13
+Revises: 7b4e91d0a6c2
+Create Date: 2026-10-18 11:40:05.907316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c58d2e7f4b13'
+down_revision = '7b4e91d0a6c2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.create_index('ix_post_date_posted', ['date_posted'], unique=False)
+        batch_op.create_index('ix_post_category_date_posted', ['category', 'date_posted'], unique=False)
+        batch_op.create_index('ix_post_user_published_date', ['user_id', 'is_published', 'date_posted'], unique=False)
+
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.create_index('ix_comment_post_date_posted', ['post_id', 'date_posted'], unique=False)
+        batch_op.create_index('ix_comment_user_approved_date', ['user_id', 'is_approved', 'date_posted'], unique=False)
+
+    with op.batch_alter_table('likes', schema=None) as batch_op:
+        batch_op.create_index('ix_likes_post_timestamp', ['post_id', 'timestamp'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('likes', schema=None) as batch_op:
+        batch_op.drop_index('ix_likes_post_timestamp')
+
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.drop_index('ix_comment_user_approved_date')
+        batch_op.drop_index('ix_comment_post_date_posted')
+
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.drop_index('ix_post_user_published_date')
+        batch_op.drop_index('ix_post_category_date_posted')
+        batch_op.drop_index('ix_post_date_posted')
@@ -0,0 +1,39 @@
+"""add full-text post search index
+
+Revision ID: e2a7c4f19b60
+Revises: c58d2e7f4b13
+Create Date: 2026-10-18 15:21:48.660127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a7c4f19b60'
+down_revision = 'c58d2e7f4b13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Populate with `flask search-reindex` after upgrading
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS post_search USING fts5("
+            "title, summary, body, tokenize='porter unicode61')"
+        )
+    elif dialect == 'postgresql':
+        op.execute(
+            'CREATE TABLE IF NOT EXISTS post_search ('
+            'post_id INTEGER PRIMARY KEY REFERENCES post (id) ON DELETE CASCADE, '
+            'document TSVECTOR NOT NULL)'
+        )
+        op.execute('CREATE INDEX IF NOT EXISTS ix_post_search_document ON post_search USING GIN (document)')
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        op.execute('DROP TABLE IF EXISTS post_search')